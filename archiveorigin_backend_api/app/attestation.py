@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import hashlib
-import json
 import logging
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Union
 
+import orjson
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
@@ -16,6 +20,13 @@ from models import AttestationCertificate
 
 logger = logging.getLogger("archiveorigin.attestation")
 
+CERT_SUFFIXES = {".pem", ".crt", ".cer", ".der"}
+DER_SUFFIXES = {".cer", ".der"}
+
+_CRL_DP_OID = x509.oid.ExtensionOID.CRL_DISTRIBUTION_POINTS
+
+CertificateSource = Union[str, bytes, x509.Certificate]
+
 
 def _now() -> datetime:
     return datetime.now(timezone.utc)
@@ -25,51 +36,117 @@ def sha256_hex(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
+def sha256_hex_many(blobs: Iterable[bytes]) -> list[str]:
+    """Hash a batch of blobs; hashlib is OpenSSL-backed and uses SHA-NI when the CPU has it."""
+    new = hashlib.sha256
+    return [new(blob).hexdigest() for blob in blobs]
+
+
+@dataclass(frozen=True)
+class PreparedCertificate:
+    cert: x509.Certificate
+    der: bytes
+    pem: str
+    cert_hash: str
+
+
+def format_serial(serial_number: int) -> str:
+    """Canonical stored form of a certificate serial (uppercase hex, no padding)."""
+    return format(serial_number, "X")
+
+
 def load_certificate(pem: str) -> x509.Certificate:
     return x509.load_pem_x509_certificate(pem.encode("utf-8"), default_backend())
 
 
+def _materialize(source: CertificateSource) -> tuple[x509.Certificate, bytes, str]:
+    """Return (certificate, DER, PEM text) computing each encoding at most once."""
+    if isinstance(source, str):
+        cert = load_certificate(source)
+        return cert, cert.public_bytes(encoding=serialization.Encoding.DER), source
+    if isinstance(source, bytes):
+        cert = x509.load_der_x509_certificate(source, default_backend())
+        der = source
+    else:
+        cert = source
+        der = cert.public_bytes(encoding=serialization.Encoding.DER)
+    return cert, der, ssl.DER_cert_to_PEM_cert(der)
+
+
+def _prepare(source: CertificateSource) -> PreparedCertificate:
+    cert, der, pem = _materialize(source)
+    return PreparedCertificate(cert=cert, der=der, pem=pem, cert_hash=sha256_hex(der))
+
+
+def _prepare_file(file: Path) -> tuple[PreparedCertificate, ...]:
+    return _prepare_bytes(file.read_bytes(), file.suffix.lower() in DER_SUFFIXES)
+
+
+@lru_cache(maxsize=4096)
+def _prepare_bytes(data: bytes, der_first: bool) -> tuple[PreparedCertificate, ...]:
+    # Keyed on file content: the same cert copied across seed subdirectories is
+    # parsed, serialized and hashed once.
+    materialized = [_materialize(cert) for cert in _load_certificates(data, der_first)]
+    hashes = sha256_hex_many(der for _, der, _ in materialized)
+    return tuple(
+        PreparedCertificate(cert=cert, der=der, pem=pem, cert_hash=cert_hash)
+        for (cert, der, pem), cert_hash in zip(materialized, hashes)
+    )
+
+
+def _load_certificates(data: bytes, der_first: bool) -> list[x509.Certificate]:
+    if der_first:
+        try:
+            return [x509.load_der_x509_certificate(data, default_backend())]
+        except ValueError:
+            pass  # .cer files are frequently PEM-armoured
+    return x509.load_pem_x509_certificates(data)
+
+
 def extract_crl_urls(cert: x509.Certificate) -> list[str]:
-    urls: list[str] = []
     try:
-        extension = cert.extensions.get_extension_for_class(x509.CRLDistributionPoints)
+        extension = cert.extensions.get_extension_for_oid(_CRL_DP_OID)
     except x509.ExtensionNotFound:
-        return urls
-    for point in extension.value:
-        if point.full_name:
-            for name in point.full_name:
-                if isinstance(name, x509.UniformResourceIdentifier):
-                    urls.append(name.value)
-    return urls
-
-
-def ingest_certificate(pem: str, metadata: Optional[dict], db: Session) -> AttestationCertificate:
-    cert = load_certificate(pem)
-    der = cert.public_bytes(encoding=serialization.Encoding.DER)
-    cert_hash = sha256_hex(der)
-    serial_number = format(cert.serial_number, "X")
+        return []
+    return [
+        name.value
+        for point in extension.value
+        if point.full_name
+        for name in point.full_name
+        if isinstance(name, x509.UniformResourceIdentifier)
+    ]
+
+
+def ingest_certificate(pem: CertificateSource, metadata: Optional[dict], db: Session) -> AttestationCertificate:
+    """Upsert a certificate given as PEM text, DER bytes or an already-parsed object."""
+    return _upsert_certificate(_prepare(pem), metadata, db)
+
+
+def _upsert_certificate(prepared: PreparedCertificate, metadata: Optional[dict], db: Session) -> AttestationCertificate:
+    cert, pem, cert_hash = prepared.cert, prepared.pem, prepared.cert_hash
+    serial_number = format_serial(cert.serial_number)
     issuer = cert.issuer.rfc4514_string()
     crl_urls = extract_crl_urls(cert)
 
     existing = db.get(AttestationCertificate, cert_hash)
     if existing:
         existing.pem = pem
-        existing.metadata_json = json.dumps(metadata) if metadata else existing.metadata_json
+        existing.metadata_json = orjson.dumps(metadata).decode() if metadata else existing.metadata_json
         existing.serial_number = serial_number
         existing.issuer = issuer
         if crl_urls:
-            existing.crl_urls = json.dumps(crl_urls)
+            existing.crl_urls = orjson.dumps(crl_urls).decode()
         return existing
 
     record = AttestationCertificate(
         cert_hash=cert_hash,
         pem=pem,
-        metadata_json=json.dumps(metadata) if metadata else None,
+        metadata_json=orjson.dumps(metadata).decode() if metadata else None,
         revoked=False,
         created_at_utc=_now(),
         serial_number=serial_number,
         issuer=issuer,
-        crl_urls=json.dumps(crl_urls) if crl_urls else None,
+        crl_urls=orjson.dumps(crl_urls).decode() if crl_urls else None,
     )
     db.add(record)
     return record
@@ -80,15 +157,22 @@ def ingest_certificates_from_dir(path_str: str, db: Session) -> list[str]:
     if not path.exists():
         logger.warning("attestation seed dir %s does not exist", path)
         return []
+    files = sorted(
+        file for file in path.rglob("*") if file.is_file() and file.suffix.lower() in CERT_SUFFIXES
+    )
+    # File reads, OpenSSL parsing and hashing release the GIL; ORM work stays on this thread.
+    with ThreadPoolExecutor() as pool:
+        prepared = list(pool.map(_prepare_file, files))
     ingested: list[str] = []
-    for file in path.glob("**/*"):
-        if not file.is_file():
-            continue
-        if file.suffix.lower() not in {".pem", ".crt", ".cer"}:
-            continue
-        pem = file.read_text()
-        record = ingest_certificate(pem, metadata={"source": str(file)}, db=db)
-        ingested.append(record.cert_hash)
+    seen: set[str] = set()
+    for file, certs in zip(files, prepared):
+        for cert in certs:
+            ingested.append(cert.cert_hash)
+            # Pending rows are invisible to db.get() without autoflush; upsert each hash once.
+            if cert.cert_hash in seen:
+                continue
+            seen.add(cert.cert_hash)
+            _upsert_certificate(cert, metadata={"source": str(file)}, db=db)
     if ingested:
         logger.info("Ingested %s attestation certs from %s", len(ingested), path)
     return ingested
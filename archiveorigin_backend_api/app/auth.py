@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import hmac
-import hashlib
+import time
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Optional
 
 from fastapi import HTTPException, status
@@ -12,7 +12,7 @@ from config import settings
 
 AUTH_WINDOW_SECONDS = 300
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ClientIdentity:
     api_key: Optional[str]
     name: str
@@ -21,18 +21,24 @@ class ClientIdentity:
     allow_manifest_summary: bool
 
 def _now_epoch() -> int:
-    return int(datetime.now(tz=timezone.utc).timestamp())
+    return int(time.time())
+
+@lru_cache(maxsize=8)
+def _anonymous_identity(rate_limit: int, allow_manifest_summary: bool) -> ClientIdentity:
+    # Shared across requests, which is safe because ClientIdentity is frozen.
+    return ClientIdentity(
+        api_key=None,
+        name="anonymous",
+        authenticated=False,
+        rate_limit=rate_limit,
+        allow_manifest_summary=allow_manifest_summary,
+    )
 
 def authenticate_request(headers, payload_content_hash: Optional[str]) -> ClientIdentity:
-    api_key = headers.get("x-api-key") or headers.get("X-Api-Key")
+    # Starlette headers are case-insensitive, so one lookup covers every spelling.
+    api_key = headers.get("x-api-key")
     if not api_key:
-        return ClientIdentity(
-            api_key=None,
-            name="anonymous",
-            authenticated=False,
-            rate_limit=settings.anonymous_rate_limit_per_minute,
-            allow_manifest_summary=settings.allow_manifest_summary,
-        )
+        return _anonymous_identity(settings.anonymous_rate_limit_per_minute, settings.allow_manifest_summary)
 
     key_record = settings.verifier_api_keys.get(api_key)
     if not key_record:
@@ -52,8 +58,10 @@ def authenticate_request(headers, payload_content_hash: Optional[str]) -> Client
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="timestamp_out_of_window")
 
     message = f"{timestamp}:{payload_content_hash or ''}"
-    secret = key_record["hmac_secret"].encode("utf-8")
-    expected = hmac.new(secret, message.encode("utf-8"), hashlib.sha256).hexdigest()
+    # Settings keys every record's HMAC state once at load; a missing template is a config bug.
+    mac = key_record["_hmac_template"].copy()
+    mac.update(message.encode("utf-8"))
+    expected = mac.hexdigest()
     if not hmac.compare_digest(expected, signature_header):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid_signature")
 
@@ -1,8 +1,11 @@
-import json
+import hashlib
+import hmac
 import logging
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Dict, Any, Literal
 
+import orjson
 from pydantic import Field, model_validator, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -45,6 +48,7 @@ class Settings(BaseSettings):
     devicecheck_private_key: Optional[str] = None
     devicecheck_private_key_path: Optional[str] = None
     devicecheck_environment: Literal["production", "development"] = "production"
+    devicecheck_jwt_expiry_minutes: int = 15
     devicecheck_allowed_bundle_ids: list[str] = Field(default_factory=list)
     attestation_seed_dir: Optional[str] = None
     crl_sources: list[str] = Field(default_factory=list)
@@ -65,10 +69,10 @@ class Settings(BaseSettings):
                 return []
             if value.startswith("["):
                 try:
-                    parsed = json.loads(value)
+                    parsed = orjson.loads(value)
                     if isinstance(parsed, list):
                         return [str(origin).strip() for origin in parsed if str(origin).strip()]
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     pass
             cleaned = [origin.strip() for origin in value.split(",")]
             return [origin for origin in cleaned if origin]
@@ -83,8 +87,8 @@ class Settings(BaseSettings):
             return value
         if isinstance(value, str):
             try:
-                parsed = json.loads(value)
-            except json.JSONDecodeError:
+                parsed = orjson.loads(value)
+            except orjson.JSONDecodeError:
                 return {}
             if isinstance(parsed, list):
                 result: Dict[str, Dict[str, Any]] = {}
@@ -105,6 +109,18 @@ class Settings(BaseSettings):
                 return result
         return value
 
+    @field_validator("verifier_api_keys", mode="after")
+    @classmethod
+    def _attach_hmac_templates(cls, value):
+        # Keyed HMAC state is built once per key; requests only .copy() it.
+        for record in value.values():
+            secret = record.get("hmac_secret") if isinstance(record, dict) else None
+            if not secret:
+                continue
+            if "_hmac_template" not in record:
+                record["_hmac_template"] = hmac.new(str(secret).encode("utf-8"), None, hashlib.sha256)
+        return value
+
     @field_validator("devicecheck_allowed_bundle_ids", mode="before")
     @classmethod
     def _parse_bundle_ids(cls, value):
@@ -118,10 +134,10 @@ class Settings(BaseSettings):
                 return []
             if text.startswith("["):
                 try:
-                    parsed = json.loads(text)
+                    parsed = orjson.loads(text)
                     if isinstance(parsed, list):
                         return [str(item).strip() for item in parsed if str(item).strip()]
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     pass
             return [item.strip() for item in text.split(",") if item.strip()]
         return value
@@ -139,10 +155,10 @@ class Settings(BaseSettings):
                 return []
             if text.startswith("["):
                 try:
-                    parsed = json.loads(text)
+                    parsed = orjson.loads(text)
                     if isinstance(parsed, list):
                         return [str(item).strip() for item in parsed if str(item).strip()]
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     pass
             return [item.strip() for item in text.split(",") if item.strip()]
         return value
@@ -174,4 +190,9 @@ class Settings(BaseSettings):
                 logger.warning("attestation_seed_dir %s does not exist", attn_path)
         return self
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build Settings once per process; env/JSON parsing is not repeated on later calls."""
+    return Settings()
+
+settings = get_settings()
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Iterable, Set
+from typing import Dict, Iterable, Optional, Sequence, Set, Union
 
 import httpx
+import orjson
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
 from config import settings
@@ -28,60 +30,133 @@ def _load_crl(data: bytes) -> x509.CertificateRevocationList:
         return x509.load_pem_x509_crl(data, default_backend())
 
 
-def _fetch(url: str) -> bytes:
-    resp = httpx.get(url, timeout=settings.crl_request_timeout_seconds)
+async def _fetch(client: httpx.AsyncClient, url: str) -> bytes:
+    resp = await client.get(url)
     resp.raise_for_status()
     return resp.content
 
 
-def _collect_urls(db: Session) -> Set[str]:
-    urls: Set[str] = set(settings.crl_sources or [])
+async def _fetch_all(urls: Sequence[str]) -> list[Union[bytes, BaseException]]:
+    """Fetch all CRLs concurrently over one pooled client; failures are returned, not raised."""
+    async with httpx.AsyncClient(timeout=settings.crl_request_timeout_seconds) as client:
+        return await asyncio.gather(*(_fetch(client, url) for url in urls), return_exceptions=True)
+
+
+def _fetch_all_blocking(urls: Sequence[str]) -> list[Union[bytes, BaseException]]:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_fetch_all(urls))
+    # Called from inside a running loop (uvicorn imports main from its own loop), where
+    # asyncio.run refuses to nest; give the fetch its own loop on a worker thread.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(lambda: asyncio.run(_fetch_all(urls))).result()
+
+
+def _scan_cert_urls(db: Session) -> frozenset[str]:
+    urls: Set[str] = set()
     stmt = select(AttestationCertificate.crl_urls).where(AttestationCertificate.crl_urls.is_not(None))
     for (raw,) in db.execute(stmt):
         try:
-            entries = json.loads(raw)
+            entries = orjson.loads(raw)
             for entry in entries:
                 urls.add(entry)
-        except (json.JSONDecodeError, TypeError):
+        except (orjson.JSONDecodeError, TypeError):
             continue
+    return frozenset(urls)
+
+
+def _cert_urls_watermark(db: Session) -> tuple:
+    # crl_urls are derived from the DER, which is keyed by cert_hash, so rows only
+    # change URL sets by being inserted: count + newest insert identifies the set.
+    count, newest = db.execute(
+        select(func.count(), func.max(AttestationCertificate.created_at_utc)).where(
+            AttestationCertificate.crl_urls.is_not(None)
+        )
+    ).one()
+    return id(db.get_bind()), count, newest
+
+
+_cert_urls_cache: Optional[tuple[tuple, frozenset[str]]] = None
+
+
+def _collect_urls(db: Session) -> Set[str]:
+    global _cert_urls_cache
+    watermark = _cert_urls_watermark(db)
+    cached = _cert_urls_cache
+    if cached is None or cached[0] != watermark:
+        cached = (watermark, _scan_cert_urls(db))
+        _cert_urls_cache = cached
+    urls: Set[str] = set(settings.crl_sources or [])
+    urls.update(cached[1])
     return {url for url in urls if url}
 
 
+def _known_serials(db: Session) -> Dict[int, Set[str]]:
+    """Map stored serials by integer value to the exact strings found in the table."""
+    stmt = select(AttestationCertificate.serial_number).where(AttestationCertificate.serial_number.is_not(None))
+    known: Dict[int, Set[str]] = {}
+    for (serial,) in db.execute(stmt):
+        try:
+            value = int(serial, 16)
+        except ValueError:
+            continue
+        known.setdefault(value, set()).add(serial)
+    return known
+
+
 def refresh_crls(db: Session) -> dict:
     urls = _collect_urls(db)
     if not urls:
         logger.info("No CRL URLs configured")
         return {"checked": 0, "revoked": 0}
 
-    revoked_serials: Set[str] = set()
+    ordered_urls = sorted(urls)
+    contents = _fetch_all_blocking(ordered_urls)
+
+    # Large WebPKI CRLs list 10^5-10^6 serials, nearly all for certs we never stored, so
+    # filter against the stored serials while walking instead of materializing them all.
+    known = _known_serials(db)
+    matched: Set[int] = set()
     checked = 0
-    for url in urls:
+    for url, content in zip(ordered_urls, contents):
+        if isinstance(content, BaseException):
+            logger.warning("Failed to fetch CRL %s: %s", url, content)
+            continue
         try:
-            content = _fetch(url)
             crl = _load_crl(content)
         except Exception as exc:  # noqa: BLE001
             logger.warning("Failed to fetch CRL %s: %s", url, exc)
             continue
         checked += 1
-        for revoked in crl:
-            revoked_serials.add(format(revoked.serial_number, "X"))
+        if known:
+            matched.update(serial for serial in (revoked.serial_number for revoked in crl) if serial in known)
 
     result = {"checked": checked, "revoked": 0}
+    # Bind the stored strings verbatim so the IN (...) stays an index seek even for
+    # rows written before serials were canonicalized.
+    revoked_serials: Set[str] = set()
+    for serial in matched:
+        revoked_serials.update(known[serial])
     if not revoked_serials:
         return result
 
-    stmt = select(AttestationCertificate).where(AttestationCertificate.serial_number.in_(revoked_serials))
     now = _now()
-    count = 0
-    for cert in db.scalars(stmt):
-        if cert.revoked:
-            cert.last_checked_at = now
-            continue
-        cert.revoked = True
-        cert.revoked_at = now
-        cert.revocation_reason = "crl_revoked"
-        cert.last_checked_at = now
-        count += 1
+    in_crl = AttestationCertificate.serial_number.in_(revoked_serials)
+    # Touch already-revoked rows first so the second statement only sees new revocations.
+    db.execute(
+        update(AttestationCertificate)
+        .where(in_crl, AttestationCertificate.revoked.is_(True))
+        .values(last_checked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    newly_revoked = db.execute(
+        update(AttestationCertificate)
+        .where(in_crl, AttestationCertificate.revoked.is_(False))
+        .values(revoked=True, revoked_at=now, revocation_reason="crl_revoked", last_checked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    count = newly_revoked.rowcount
     db.commit()
     result["revoked"] = count
     logger.info("CRL refresh complete checked=%s newly_revoked=%s", checked, count)
@@ -9,13 +9,23 @@ See DEVELOPMENT_ROADMAP.md for details.
 from __future__ import annotations
 
 import logging
+import secrets
+import threading
 import time
-import uuid
 from dataclasses import dataclass
 from typing import Optional
 
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from config import settings
+
 logger = logging.getLogger("archiveorigin.devicecheck")
 
+# Re-sign the provider JWT this many seconds before it expires.
+JWT_REFRESH_MARGIN_SECONDS = 30
+
 
 class DeviceCheckError(Exception):
     """DeviceCheck API error"""
@@ -47,18 +57,60 @@ class DeviceCheckClient:
         private_key: str,
         environment: str = "production",
         timeout_seconds: float = 5.0,
+        jwt_expiry_minutes: Optional[int] = None,
     ):
         self.team_id = team_id
         self.key_id = key_id
         self.private_key = private_key
         self.environment = environment
         self.timeout_seconds = timeout_seconds
+        if jwt_expiry_minutes is None:
+            jwt_expiry_minutes = settings.devicecheck_jwt_expiry_minutes
+        self.jwt_expiry_minutes = jwt_expiry_minutes
+        self._exp_delta_seconds = jwt_expiry_minutes * 60
+        self._signing_key = self._load_private_key(private_key)
+        self._jwt_cache: Optional[tuple[str, int]] = None
+        self._jwt_lock = threading.Lock()
         logger.info("MOCK DeviceCheckClient initialized (environment=%s)", environment)
 
+    @staticmethod
+    def _load_private_key(private_key: str) -> Optional[ec.EllipticCurvePrivateKey]:
+        """Parse a PEM signing key once so JWT signing never re-decodes it."""
+        if not private_key or "-----BEGIN" not in private_key:
+            return None
+        try:
+            key = serialization.load_pem_private_key(private_key.encode("utf-8"), password=None)
+        except (ValueError, TypeError) as exc:
+            raise DeviceCheckError("invalid_private_key") from exc
+        if not isinstance(key, ec.EllipticCurvePrivateKey):
+            raise DeviceCheckError("invalid_private_key")
+        return key
+
     def _jwt(self) -> str:
-        """MOCK: Generate JWT token"""
-        # TODO: Replace with real jwt.encode() using ES256
-        return f"mock_jwt_token_{int(time.time())}"
+        """Return the cached provider JWT, re-signing only when it nears expiry."""
+        now = int(time.time())
+        cached = self._jwt_cache
+        if cached is not None and now < cached[1] - JWT_REFRESH_MARGIN_SECONDS:
+            return cached[0]
+        with self._jwt_lock:
+            cached = self._jwt_cache
+            if cached is not None and now < cached[1] - JWT_REFRESH_MARGIN_SECONDS:
+                return cached[0]
+            expires_at = now + self._exp_delta_seconds
+            token = self._sign_jwt(now, expires_at)
+            self._jwt_cache = (token, expires_at)
+            return token
+
+    def _sign_jwt(self, issued_at: int, expires_at: int) -> str:
+        """Sign an ES256 provider JWT; falls back to a mock token without a PEM key."""
+        if self._signing_key is None:
+            return f"mock_jwt_token_{issued_at}"
+        return jwt.encode(
+            {"iss": self.team_id, "iat": issued_at, "exp": expires_at},
+            self._signing_key,
+            algorithm="ES256",
+            headers={"kid": self.key_id},
+        )
 
     def validate(
         self, 
@@ -75,7 +127,7 @@ class DeviceCheckClient:
             raise DeviceCheckError("missing_device_token")
         
         # MOCK: Always return success
-        transaction_id = str(uuid.uuid4())
+        transaction_id = secrets.token_hex(16)
         timestamp = int(time.time())
         
         logger.debug(
@@ -92,17 +144,33 @@ class DeviceCheckClient:
 
 
 _client: Optional[DeviceCheckClient] = None
+_client_lock = threading.Lock()
 
 
 def get_devicecheck_client() -> DeviceCheckClient:
     """Get or create singleton DeviceCheck client"""
     global _client
-    if _client is None:
-        # TODO: Load from settings when ready for production
-        _client = DeviceCheckClient(
-            team_id="MOCK_TEAM_ID",
-            key_id="MOCK_KEY_ID",
-            private_key="MOCK_PRIVATE_KEY",
-            environment="development",
-        )
-    return _client
+    client = _client
+    if client is not None:
+        return client
+    with _client_lock:
+        # Re-check under the lock so concurrent first requests build one client.
+        if _client is None:
+            # TODO: Load from settings when ready for production
+            _client = DeviceCheckClient(
+                team_id="MOCK_TEAM_ID",
+                key_id="MOCK_KEY_ID",
+                private_key="MOCK_PRIVATE_KEY",
+                environment="development",
+                jwt_expiry_minutes=settings.devicecheck_jwt_expiry_minutes,
+            )
+        return _client
+
+
+def close_devicecheck_client() -> None:
+    """Close the singleton DeviceCheck client, if one was created"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
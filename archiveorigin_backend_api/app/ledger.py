@@ -1,23 +1,34 @@
 from __future__ import annotations
 
 import argparse
-import json
 import subprocess
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterable, Optional, Sequence
 
+import orjson
 import ulid
-from sqlalchemy import select
+from sqlalchemy import Row, select, update
 from sqlalchemy.orm import Session
 
 from config import settings
 from db import SessionLocal
-from merkle import MerkleComputationError, build_merkle_tree
+from merkle import SHA256_PREFIX, MerkleComputationError, iter_merkle_levels
 from models import CaptureRecord
 
 
+# Layout of the human-readable ledger artifacts: 2-space indent, sorted keys, trailing newline.
+_PRETTY_JSON = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE
+# Journal lines are built from literal dicts, so insertion order is already deterministic.
+_JSONL = orjson.OPT_APPEND_NEWLINE
+
+# Record ids bound per sealing UPDATE, well under SQLite's and Postgres's bind-parameter caps.
+_SEAL_UPDATE_CHUNK = 500
+
+_ROOTS_CSV_HEADER = "sealed_at_utc,root_hash,batch_id,record_count"
+
+
 @dataclass
 class BatchResult:
     batch_id: str
@@ -39,12 +50,61 @@ def _ensure_dir(path: Path) -> Path:
     return path
 
 
+def _root_index_paths(roots_dir: Path) -> tuple[Path, Path]:
+    """Return (materialized JSON index, append-only JSONL journal)."""
+    index_path = roots_dir / settings.ledger_root_index_filename
+    return index_path, index_path.with_suffix(".jsonl")
+
+
+def _read_json_index(index_path: Path) -> list[dict]:
+    if not index_path.exists():
+        return []
+    try:
+        loaded = orjson.loads(index_path.read_bytes())
+    except orjson.JSONDecodeError:
+        return []
+    return loaded if isinstance(loaded, list) else []
+
+
+def _append_root_index(roots_dir: Path, entry: dict) -> Path:
+    """Append one sealed batch to the roots journal; O(1) regardless of ledger history."""
+    index_path, journal_path = _root_index_paths(roots_dir)
+    payload = b""
+    if not journal_path.exists():
+        # Seed the journal once from a JSON index written before the journal existed.
+        payload = b"".join(orjson.dumps(item, option=_JSONL) for item in _read_json_index(index_path))
+    with journal_path.open("ab") as fh:
+        fh.write(payload + orjson.dumps(entry, option=_JSONL))
+    return journal_path
+
+
+def rebuild_root_index() -> Path:
+    """Materialize the sorted JSON roots index from the append-only journal."""
+    roots_dir = _ensure_dir(_ledger_root() / settings.ledger_roots_subdir)
+    index_path, journal_path = _root_index_paths(roots_dir)
+    if not journal_path.exists():
+        entries = _read_json_index(index_path)
+    else:
+        entries = []
+        with journal_path.open("rb") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    continue
+    entries.sort(key=lambda item: item.get("sealed_at_utc", ""))
+    index_path.write_bytes(orjson.dumps(entries, option=_PRETTY_JSON))
+    return index_path
+
+
 def _write_ledger_files(
     batch_id: str,
     root_hash: str,
     sealed_at: datetime,
-    records: Sequence[CaptureRecord],
-    tree_levels: Sequence[Sequence[str]],
+    records: Sequence[Row],
+    merkle_levels: Sequence[Sequence[str]],
 ) -> tuple[Path, ...]:
     ledger_root = _ledger_root()
     batches_dir = _ensure_dir(ledger_root / settings.ledger_batches_subdir)
@@ -54,9 +114,6 @@ def _write_ledger_files(
     batch_filename = f"{sealed_at.strftime('%Y-%m-%d')}_{batch_id}.json"
     batch_path = batches_dir / batch_filename
 
-    formatted_levels = [
-        [f"sha256:{node}" for node in level] for level in tree_levels
-    ]
     batch_payload = {
         "batch_id": batch_id,
         "root_hash": root_hash,
@@ -71,39 +128,22 @@ def _write_ledger_files(
             }
             for rec in records
         ],
-        "merkle_tree_levels": formatted_levels,
+        "merkle_tree_levels": merkle_levels,
     }
-    with batch_path.open("w", encoding="utf-8") as fh:
-        json.dump(batch_payload, fh, indent=2, sort_keys=True)
-        fh.write("\n")
+    batch_path.write_bytes(orjson.dumps(batch_payload, option=_PRETTY_JSON))
 
-    index_path = roots_dir / settings.ledger_root_index_filename
-    index_entries: list[dict] = []
-    if index_path.exists():
-        try:
-            loaded = json.loads(index_path.read_text(encoding="utf-8"))
-            if isinstance(loaded, list):
-                index_entries = loaded
-        except json.JSONDecodeError:
-            index_entries = []
-    index_entries.append(
+    index_path = _append_root_index(
+        roots_dir,
         {
             "batch_id": batch_id,
             "sealed_at_utc": sealed_at.isoformat(),
             "root_hash": root_hash,
             "record_count": len(records),
             "batch_file": batch_path.relative_to(ledger_root).as_posix(),
-        }
+        },
     )
-    index_entries.sort(key=lambda item: item["sealed_at_utc"])
-    with index_path.open("w", encoding="utf-8") as fh:
-        json.dump(index_entries, fh, indent=2, sort_keys=True)
-        fh.write("\n")
 
     roots_csv = roots_dir / settings.ledger_daily_roots_filename
-    csv_header = "sealed_at_utc,root_hash,batch_id,record_count"
-    if not roots_csv.exists():
-        roots_csv.write_text(csv_header + "\n", encoding="utf-8")
     csv_line = ",".join(
         [
             sealed_at.isoformat(),
@@ -113,6 +153,8 @@ def _write_ledger_files(
         ]
     )
     with roots_csv.open("a", encoding="utf-8") as fh:
+        if fh.tell() == 0:
+            fh.write(_ROOTS_CSV_HEADER + "\n")
         fh.write(csv_line + "\n")
 
     proof_manifest = proofs_dir / settings.ledger_proof_manifest_filename
@@ -129,31 +171,49 @@ def _write_ledger_files(
             for rec in records
         ],
     }
-    with proof_manifest.open("a", encoding="utf-8") as fh:
-        fh.write(json.dumps(proof_entry, sort_keys=True) + "\n")
+    with proof_manifest.open("ab") as fh:
+        fh.write(orjson.dumps(proof_entry, option=_JSONL))
 
     return batch_path, index_path, roots_csv, proof_manifest
 
 
+def _read_head_sha(git_dir: Path = Path(".git")) -> Optional[str]:
+    """Resolve HEAD from the repository files, avoiding a `git rev-parse` fork."""
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        if head.startswith("ref: "):
+            head = (git_dir / head[len("ref: "):]).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None  # worktree .git file, packed ref, or not at the repo root
+    if len(head) == 40 and all(char in "0123456789abcdef" for char in head):
+        return head
+    return None
+
+
 def _git_commit(paths: Iterable[Path], message: str) -> Optional[str]:
+    # New batch files are untracked, so `git commit -- <paths>` alone cannot pick them up.
     try:
         subprocess.run(
-            ["git", "add", *[str(path) for path in paths]],
+            ["git", "add", "--", *[str(path) for path in paths]],
             check=True,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
         )
         subprocess.run(
             ["git", "commit", "-m", message],
             check=True,
-            capture_output=True,
-        )
-        show = subprocess.run(
-            ["git", "rev-parse", "HEAD"],
-            check=True,
-            capture_output=True,
-            text=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
         )
-        return show.stdout.strip()
+        sha = _read_head_sha()
+        if sha is None:
+            show = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                check=True,
+                capture_output=True,
+            )
+            sha = show.stdout.decode().strip()
+        return sha
     except FileNotFoundError:
         raise RuntimeError("git executable not found; cannot commit ledger batch")
     except subprocess.CalledProcessError as exc:
@@ -165,7 +225,8 @@ def _git_push(remote: str, branch: str) -> None:
         subprocess.run(
             ["git", "push", remote, branch],
             check=True,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
         )
     except FileNotFoundError:
         raise RuntimeError("git executable not found; cannot push ledger batch")
@@ -181,21 +242,34 @@ def seal_pending_records(
     git_remote: Optional[str] = None,
     git_branch: Optional[str] = None,
 ) -> Optional[BatchResult]:
+    # Only the columns written to the ledger artifacts; plain rows skip ORM instance construction.
     stmt = (
-        select(CaptureRecord)
-        .where(CaptureRecord.merkle_batch_id.is_(None))
+        select(
+            CaptureRecord.record_id,
+            CaptureRecord.asset_hash,
+            CaptureRecord.capture_time_utc,
+            CaptureRecord.device_id,
+        )
+        .where(
+            CaptureRecord.merkle_batch_id.is_(None),
+            CaptureRecord.asset_hash.is_not(None),
+            CaptureRecord.asset_hash != "",
+        )
         .order_by(CaptureRecord.created_at_utc.asc())
     )
-    records = list(session.scalars(stmt))
-    records = [rec for rec in records if rec.asset_hash]
+    records = session.execute(stmt).all()
     if not records:
         return None
 
     leaves = [rec.asset_hash for rec in records]
     try:
-        root_hash, tree_levels = build_merkle_tree(leaves)
+        # Format each level as it is produced so the raw level can be freed before the next.
+        merkle_levels = [
+            [SHA256_PREFIX + node.decode("utf-8") for node in level] for level in iter_merkle_levels(leaves)
+        ]
     except MerkleComputationError as exc:
         raise RuntimeError(f"Unable to compute Merkle root: {exc}") from exc
+    root_hash = merkle_levels[-1][0]
 
     batch_id = str(ulid.ULID())
     sealed_at = datetime.now(timezone.utc)
@@ -206,12 +280,18 @@ def seal_pending_records(
             root_hash,
             sealed_at,
             records,
-            tree_levels,
+            merkle_levels,
         )
-        for rec in records:
-            rec.merkle_batch_id = batch_id
-            rec.merkle_root_hash = root_hash
-            rec.merkle_sealed_at_utc = sealed_at
+        record_ids = [rec.record_id for rec in records]
+        seal = (
+            update(CaptureRecord)
+            .values(merkle_batch_id=batch_id, merkle_root_hash=root_hash, merkle_sealed_at_utc=sealed_at)
+            .execution_options(synchronize_session=False)
+        )
+        # Chunked so a large backlog never exceeds the bind limit; all chunks share one transaction.
+        for start in range(0, len(record_ids), _SEAL_UPDATE_CHUNK):
+            chunk = record_ids[start:start + _SEAL_UPDATE_CHUNK]
+            session.execute(seal.where(CaptureRecord.record_id.in_(chunk)))
         session.commit()
     except Exception:
         session.rollback()
@@ -243,8 +323,14 @@ def main() -> None:
     parser.add_argument("--push", action="store_true", help="Push the git commit to the configured remote.")
     parser.add_argument("--remote", type=str, default=settings.ledger_git_remote, help="Git remote name (default: %(default)s).")
     parser.add_argument("--branch", type=str, default=settings.ledger_git_branch, help="Git branch name (default: %(default)s).")
+    subcommands = parser.add_subparsers(dest="command")
+    subcommands.add_parser("rebuild-index", help="Regenerate the sorted JSON roots index from the roots journal.")
     args = parser.parse_args()
 
+    if args.command == "rebuild-index":
+        print(f"Rebuilt roots index {rebuild_root_index()}")
+        return
+
     commit_to_git = args.commit or settings.ledger_git_auto_commit
     push_to_git = args.push or settings.ledger_git_auto_push
     if push_to_git:
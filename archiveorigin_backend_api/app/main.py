@@ -1,13 +1,13 @@
-from fastapi import FastAPI, Depends, HTTPException, Header, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, HTTPException, Header, Request, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.encoders import jsonable_encoder
 from sqlalchemy import text, select
 from sqlalchemy.orm import Session
 from typing import Optional, Union
 from datetime import datetime, timezone, timedelta
 import orjson
 import logging
+import secrets
 import uuid
 
 from config import settings
@@ -34,14 +34,16 @@ from auth import authenticate_request
 from rate_limit import global_rate_limiter
 from verification import perform_verification, perform_ledger_lookup
 from time_sync import trusted_time
-from devicecheck import get_devicecheck_client, DeviceCheckError
+from devicecheck import get_devicecheck_client, close_devicecheck_client, DeviceCheckError
 from attestation import ingest_certificates_from_dir
 from crl import refresh_crls
 
 logger = logging.getLogger("archiveorigin.api")
 logging.basicConfig(level=getattr(logging, settings.log_level.upper(), logging.INFO))
 
-app = FastAPI(title="Archive Origin Proof API", default_response_class=JSONResponse)
+_VERIFY_URL_PREFIX = settings.verify_base_url.rstrip("/") + "/v/"
+
+app = FastAPI(title="Archive Origin Proof API", default_response_class=ORJSONResponse)
 
 allow_origins = settings.cors_allow_origins or ["*"]
 app.add_middleware(
@@ -52,6 +54,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("shutdown")
+def _close_outbound_clients():
+    close_devicecheck_client()
+    trusted_time.stop()
+
 # Ensure tables exist (idempotent)
 with engine.begin() as conn:
     Base.metadata.create_all(bind=conn)
@@ -93,9 +101,9 @@ def _require_tls(request: Request):
     raise HTTPException(status_code=400, detail="tls_required")
 
 def _request_id(request: Request) -> str:
-    return request.headers.get("X-Request-ID") or str(uuid.uuid4())
+    return request.headers.get("X-Request-ID") or secrets.token_hex(16)
 
-def _apply_response_headers(resp: JSONResponse, request_id: str):
+def _apply_response_headers(resp: Response, request_id: str):
     resp.headers["Cache-Control"] = "private, max-age=30"
     resp.headers["X-Request-ID"] = request_id
 
@@ -186,8 +194,7 @@ def enroll_device(payload: EnrollRequest, request: Request, db: Session = Depend
     return EnrollResponse(token=token, issued_at=issued_at, expires_at=expires_at)
 
 def _parse_iso(s: str) -> datetime:
-    if s.endswith("Z"):
-        s = s.replace("Z", "+00:00")
+    # Python 3.11+ parses a trailing "Z" natively; no "+00:00" rewrite needed.
     return datetime.fromisoformat(s)
 
 @app.post("/lock-proof", response_model=LockProofResponse)
@@ -236,7 +243,7 @@ def lock_proof(
 
     record_id = str(uuid.uuid4())
     shortcode = random_shortcode(6)
-    verify_url = settings.verify_base_url.rstrip("/") + "/v/" + record_id
+    verify_url = _VERIFY_URL_PREFIX + record_id
 
     rec = CaptureRecord(
         record_id=record_id,
@@ -274,21 +281,20 @@ def lock_proof(
     "/api/v1/verify",
     response_model=Union[VerifySuccessResponse, VerifyFailureResponse],
 )
-def verify_artifact(payload: VerifyRequest, request: Request, db: Session = Depends(get_db)):
+def verify_artifact(payload: VerifyRequest, request: Request, response: Response, db: Session = Depends(get_db)):
     _require_tls(request)
     request_id = _request_id(request)
     identity = authenticate_request(request.headers, payload.content_hash)
     _rate_limit(request, identity)
     result = perform_verification(payload, identity, db)
-    response = JSONResponse(content=jsonable_encoder(result))
     _apply_response_headers(response, request_id)
-    return response
+    return result
 
 @app.post(
     "/api/v1/ledger/lookup",
     response_model=LedgerLookupResponse,
 )
-def ledger_lookup(payload: LedgerLookupRequest, request: Request, db: Session = Depends(get_db)):
+def ledger_lookup(payload: LedgerLookupRequest, request: Request, response: Response, db: Session = Depends(get_db)):
     _require_tls(request)
     request_id = _request_id(request)
     identity = authenticate_request(request.headers, payload.content_hash)
@@ -296,12 +302,11 @@ def ledger_lookup(payload: LedgerLookupRequest, request: Request, db: Session =
         raise HTTPException(status_code=401, detail="api_key_required")
     _rate_limit(request, identity)
     result = perform_ledger_lookup(payload, db)
-    response = JSONResponse(content=jsonable_encoder(result))
     _apply_response_headers(response, request_id)
-    return response
+    return result
 
 @app.get("/api/v1/certs/{cert_hash}", response_model=CertificateResponse)
-def get_certificate(cert_hash: str, request: Request, db: Session = Depends(get_db)):
+def get_certificate(cert_hash: str, request: Request, response: Response, db: Session = Depends(get_db)):
     _require_tls(request)
     request_id = _request_id(request)
     identity = authenticate_request(request.headers, None)
@@ -323,6 +328,5 @@ def get_certificate(cert_hash: str, request: Request, db: Session = Depends(get_
         metadata=metadata,
         pem=cert.pem if include_pem else None,
     )
-    response = JSONResponse(content=jsonable_encoder(response_body))
     _apply_response_headers(response, request_id)
-    return response
+    return response_body
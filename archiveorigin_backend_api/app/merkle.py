@@ -1,49 +1,76 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Iterable, List, Sequence, Tuple
+import re
+from binascii import hexlify
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
 
 SHA256_PREFIX = "sha256:"
 SHA256_LENGTH = 64
+_HEX_DIGEST_RE = re.compile(rb"[0-9a-fA-F]{%d}" % SHA256_LENGTH)
 
 
 class MerkleComputationError(RuntimeError):
     """Raised when Merkle tree computation cannot be completed."""
 
 
-def _strip_prefix(value: str) -> str:
-    if not value.startswith(SHA256_PREFIX):
-        raise MerkleComputationError("hash must start with 'sha256:'")
-    digest = value.split("sha256:", 1)[1]
-    if len(digest) != SHA256_LENGTH:
-        raise MerkleComputationError("sha256 digest must be 64 hex characters")
+def _leaf_bytes(value: Union[str, bytes]) -> bytes:
+    """Normalize a leaf to lowercase hex bytes; accepts `sha256:<hex>`, bare hex, or hex bytes."""
+    if isinstance(value, bytes):
+        digest = value
+    elif value.startswith(SHA256_PREFIX):
+        digest = value[len(SHA256_PREFIX):].encode("utf-8")
+    else:
+        digest = value.encode("utf-8")
+    if not _HEX_DIGEST_RE.fullmatch(digest):
+        raise MerkleComputationError("sha256 digest must be 64 hex characters, optionally prefixed with 'sha256:'")
     return digest.lower()
 
 
-def _hash_pair(left: str, right: str) -> str:
-    data = (left + right).encode("utf-8")
-    digest = hashlib.sha256(data).hexdigest()
-    return digest
+def _hash_level(level: Sequence[bytes]) -> List[bytes]:
+    """Hash one level into its parents, duplicating the last node on odd counts.
 
-
-def compute_merkle_root(leaves: Sequence[str]) -> str:
+    Parents hash the concatenated lowercase hex text of their children (the published
+    ledger format), so nodes are carried as ASCII-hex bytes rather than raw digests.
     """
-    Compute a Merkle root from a sequence of sha256-prefixed hashes.
+    # One contiguous buffer per level; each parent hashes a 2*64-byte memoryview slice.
+    buf = memoryview(b"".join(level))
+    pair_width = 2 * SHA256_LENGTH
+    paired_end = len(buf) - len(buf) % pair_width
+    # OpenSSL-backed constructor: template.copy() and the builtin _sha256 were no faster.
+    sha256 = hashlib.sha256
+    parents = [
+        hexlify(sha256(buf[offset:offset + pair_width]).digest())
+        for offset in range(0, paired_end, pair_width)
+    ]
+    if paired_end != len(buf):
+        # Odd count: pair the trailing node with itself without copying the level.
+        parents.append(hexlify(sha256(level[-1] + level[-1]).digest()))
+    return parents
+
+
+def iter_merkle_levels(leaves: Sequence[Union[str, bytes]]) -> Iterator[List[bytes]]:
+    """
+    Yield each tree level bottom-up as lists of hex-digest bytes, ending with the root.
+    Only the current level is kept alive, so callers can format and drop levels as they go.
     """
     if not leaves:
         raise MerkleComputationError("at least one leaf hash is required")
 
-    level = [_strip_prefix(leaf) for leaf in leaves]
-
+    level = [_leaf_bytes(leaf) for leaf in leaves]
+    yield level
     while len(level) > 1:
-        if len(level) % 2 == 1:
-            level = list(level) + [level[-1]]
-        next_level: List[str] = []
-        for idx in range(0, len(level), 2):
-            next_level.append(_hash_pair(level[idx], level[idx + 1]))
-        level = next_level
+        level = _hash_level(level)
+        yield level
 
-    return f"{SHA256_PREFIX}{level[0]}"
+
+def compute_merkle_root(leaves: Sequence[str]) -> str:
+    """
+    Compute a Merkle root from sha256 leaf hashes, with or without the prefix.
+    """
+    for level in iter_merkle_levels(leaves):
+        pass
+    return SHA256_PREFIX + level[0].decode("utf-8")
 
 
 def build_merkle_tree(leaves: Sequence[str]) -> Tuple[str, List[Sequence[str]]]:
@@ -51,21 +78,8 @@ def build_merkle_tree(leaves: Sequence[str]) -> Tuple[str, List[Sequence[str]]]:
     Build the full Merkle tree levels for auditing/debugging.
     Returns the root hash (sha256-prefixed) and the list of levels used.
     """
-    if not leaves:
-        raise MerkleComputationError("at least one leaf hash is required")
-
-    levels: List[Sequence[str]] = []
-    current = [_strip_prefix(leaf) for leaf in leaves]
-    levels.append(tuple(current))
-
-    while len(current) > 1:
-        if len(current) % 2 == 1:
-            current = list(current) + [current[-1]]
-        next_level: List[str] = []
-        for idx in range(0, len(current), 2):
-            next_level.append(_hash_pair(current[idx], current[idx + 1]))
-        current = next_level
-        levels.append(tuple(current))
-
-    root_hex = current[0]
+    levels: List[Sequence[str]] = [
+        tuple(node.decode("utf-8") for node in level) for level in iter_merkle_levels(leaves)
+    ]
+    root_hex = levels[-1][0]
     return f"{SHA256_PREFIX}{root_hex}", levels
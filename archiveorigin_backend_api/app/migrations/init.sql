@@ -36,16 +36,31 @@ CREATE TABLE IF NOT EXISTS ledger_entries (
   timestamp_utc TIMESTAMPTZ NOT NULL,
   proof_level VARCHAR(32) NOT NULL DEFAULT 'basic',
   merkle_root VARCHAR(128),
-  merkle_proof TEXT,
+  merkle_proof JSONB,
   entry_hash VARCHAR(64) NOT NULL,
   created_at_utc TIMESTAMPTZ NOT NULL,
   sourced_from TEXT
 );
 
-CREATE INDEX IF NOT EXISTS idx_ledger_content_hash ON ledger_entries (content_hash);
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'ledger_entries' AND column_name = 'merkle_proof' AND data_type = 'text'
+  ) THEN
+    ALTER TABLE ledger_entries ALTER COLUMN merkle_proof TYPE JSONB USING merkle_proof::jsonb;
+  END IF;
+END $$;
+
 CREATE INDEX IF NOT EXISTS idx_ledger_manifest_hash ON ledger_entries (manifest_hash);
 CREATE INDEX IF NOT EXISTS idx_ledger_signature_hash ON ledger_entries (device_signature_hash);
 CREATE INDEX IF NOT EXISTS idx_ledger_cert_hash ON ledger_entries (attestation_cert_hash);
+CREATE INDEX IF NOT EXISTS ix_ledger_content_covering ON ledger_entries (content_hash)
+  INCLUDE (entry_id, manifest_hash, device_signature_hash, attestation_cert_hash, timestamp_utc, proof_level, merkle_root, sourced_from);
+-- The covering index serves every content_hash probe; drop the plain single-column
+-- indexes that older deployments (this file and create_all) built alongside it.
+DROP INDEX IF EXISTS idx_ledger_content_hash;
+DROP INDEX IF EXISTS ix_ledger_entries_content_hash;
 
 CREATE TABLE IF NOT EXISTS attestation_certs (
   cert_hash VARCHAR(64) PRIMARY KEY,
@@ -1,5 +1,8 @@
+from typing import Any
+
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Text, TIMESTAMP, Boolean
+from sqlalchemy import JSON, Index, String, Text, TIMESTAMP, Boolean
+from sqlalchemy.dialects.postgresql import JSONB
 
 class Base(DeclarativeBase):
     pass
@@ -36,18 +39,37 @@ class CaptureRecord(Base):
 class LedgerEntry(Base):
     __tablename__ = "ledger_entries"
     entry_id: Mapped[str] = mapped_column(Text, primary_key=True)
-    content_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
     manifest_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     device_signature_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     attestation_cert_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
     timestamp_utc: Mapped[str] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
     proof_level: Mapped[str] = mapped_column(String(32), nullable=False, default="basic")
     merkle_root: Mapped[str | None] = mapped_column(String(128), nullable=True)
-    merkle_proof: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Native JSONB on Postgres so the driver hands back decoded proofs; generic JSON elsewhere.
+    merkle_proof: Mapped[dict[str, Any] | None] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     entry_hash: Mapped[str] = mapped_column(String(64), nullable=False)
     created_at_utc: Mapped[str] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
     sourced_from: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    __table_args__ = (
+        # Postgres serves the content_hash probe from the index leaf pages; elsewhere a plain index.
+        Index(
+            "ix_ledger_content_covering",
+            "content_hash",
+            postgresql_include=[
+                "entry_id",
+                "manifest_hash",
+                "device_signature_hash",
+                "attestation_cert_hash",
+                "timestamp_utc",
+                "proof_level",
+                "merkle_root",
+                "sourced_from",
+            ],
+        ),
+    )
+
 class AttestationCertificate(Base):
     __tablename__ = "attestation_certs"
     cert_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
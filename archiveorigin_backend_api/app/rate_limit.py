@@ -5,26 +5,34 @@ from threading import Lock
 from time import time
 
 class RateLimiter:
-    """Simple in-memory rate limiter (best-effort, single process)."""
+    """Simple in-memory token-bucket rate limiter (best-effort, single process).
 
-    def __init__(self, window_seconds: int = 60, max_entries: int = 10_000):
+    Each key holds up to `limit` tokens, refilled at `limit / window_seconds` per second.
+    Keys are striped across independently locked shards so concurrent hits rarely contend.
+    """
+
+    def __init__(self, window_seconds: int = 60, max_entries: int = 10_000, shards: int = 16):
+        if shards < 1 or shards & (shards - 1):
+            raise ValueError("shards must be a power of two")
         self.window_seconds = window_seconds
-        self.cache: TTLCache[str, tuple[int, float]] = TTLCache(maxsize=max_entries, ttl=window_seconds)
-        self.lock = Lock()
+        self._shard_mask = shards - 1
+        # An idle bucket is full again after one window, so expiring it then loses nothing.
+        self._shards: list[tuple[TTLCache[str, tuple[float, float]], Lock]] = [
+            (TTLCache(maxsize=max(1, max_entries // shards), ttl=window_seconds), Lock())
+            for _ in range(shards)
+        ]
 
     def hit(self, key: str, limit: int) -> bool:
         """Registers a hit. Returns True if allowed, False if over limit."""
         now = time()
-        with self.lock:
-            hits, window_start = self.cache.get(key, (0, now))
-            if now - window_start >= self.window_seconds:
-                hits = 0
-                window_start = now
-            if hits >= limit:
-                self.cache[key] = (hits, window_start)
+        cache, lock = self._shards[hash(key) & self._shard_mask]
+        with lock:
+            tokens, last_refill = cache.get(key, (float(limit), now))
+            tokens = min(float(limit), tokens + (now - last_refill) * limit / self.window_seconds)
+            if tokens < 1.0:
+                cache[key] = (tokens, now)
                 return False
-            hits += 1
-            self.cache[key] = (hits, window_start)
+            cache[key] = (tokens - 1.0, now)
             return True
 
 global_rate_limiter = RateLimiter()
@@ -1,4 +1,3 @@
-import base64
 from typing import Optional, Literal, Dict, Any
 from pydantic import BaseModel, Field, field_validator, ConfigDict
 from datetime import datetime
@@ -6,6 +5,13 @@ import re
 
 SHA256_PREFIXED = re.compile(r'^sha256:[0-9a-fA-F]{64}$')
 HEX64 = re.compile(r'^[0-9a-f]{64}$')
+# Standard-alphabet base64 shape; checked instead of decoding since the bytes are never used here.
+BASE64_RE = re.compile(r'[A-Za-z0-9+/]*={0,2}')
+# Shape check ahead of fromisoformat so malformed input fails without the exception path.
+ISO8601_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})?$')
+
+# Verification responses are built once per request (or shared from cache) and never mutated.
+RESPONSE_MODEL_CONFIG = ConfigDict(frozen=True)
 
 class EnrollRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -23,10 +29,8 @@ class EnrollRequest(BaseModel):
     def validate_devicecheck_token(cls, value):
         if value is None:
             return value
-        try:
-            base64.b64decode(value, validate=True)
-        except Exception as exc:  # noqa: BLE001
-            raise ValueError("devicecheck_token must be base64-encoded") from exc
+        if len(value) % 4 or not BASE64_RE.fullmatch(value):
+            raise ValueError("devicecheck_token must be base64-encoded")
         return value
 
 class EnrollResponse(BaseModel):
@@ -57,14 +61,14 @@ class LockProofRequest(BaseModel):
     @field_validator('capture_time_utc')
     @classmethod
     def check_iso8601(cls, v):
-        # Allow trailing 'Z'
+        message = 'capture_time_utc must be ISO8601 (e.g., 2025-11-03T01:01:45Z)'
+        if not ISO8601_RE.match(v):
+            raise ValueError(message)
+        # Python 3.11+ accepts the trailing 'Z' directly; this still rejects out-of-range fields.
         try:
-            if v.endswith('Z'):
-                datetime.fromisoformat(v.replace('Z', '+00:00'))
-            else:
-                datetime.fromisoformat(v)
-        except Exception:
-            raise ValueError('capture_time_utc must be ISO8601 (e.g., 2025-11-03T01:01:45Z)')
+            datetime.fromisoformat(v)
+        except ValueError:
+            raise ValueError(message)
         return v
 
 class LockProofResponse(BaseModel):
@@ -110,6 +114,8 @@ class LedgerLookupRequest(VerifyRequest):
     pass
 
 class LedgerEntrySchema(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     entry_id: str
     timestamp: datetime
     attestation_cert_hash: str
@@ -120,12 +126,16 @@ class LedgerEntrySchema(BaseModel):
     sourced_from: Optional[str]
 
 class VerificationDetails(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     signature_valid: bool
     attestation_valid: bool
     ledger_match: bool
-    notes: list[str] = Field(default_factory=list)
+    notes: tuple[str, ...] = ()
 
 class VerifySuccessResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: Literal["verified"]
     content_hash: str
     ledger_entry: LedgerEntrySchema
@@ -134,16 +144,22 @@ class VerifySuccessResponse(BaseModel):
     expires_at: datetime
 
 class VerifyFailureDetails(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     ledger_found: bool
     signature_valid: bool
     attestation_valid: bool
 
 class VerifyFailureResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: Literal["not_verified"]
     reason: Literal["ledger_not_found", "signature_mismatch", "attestation_revoked", "timestamp_mismatch"]
     details: VerifyFailureDetails
 
 class LedgerLookupResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     status: Literal["ok"]
     ledger_entry: LedgerEntrySchema
 
@@ -1,8 +1,19 @@
+import re
 import secrets
 import base64
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 
+try:
+    import nacl.encoding
+    import nacl.signing
+    _HAS_NACL = True
+except ImportError:
+    _HAS_NACL = False
+
+_ED25519_PUBKEY_RE = re.compile(r"ed25519:[A-Za-z0-9+/]{43}=")
+
 def new_token_urlsafe(n_bytes: int = 64) -> str:
     return secrets.token_urlsafe(n_bytes)
 
@@ -19,26 +30,22 @@ def near_expiry(expires_at: datetime, buffer_seconds: int) -> bool:
     return (expires_at - now_utc()).total_seconds() <= buffer_seconds
 
 def validate_pubkey_format(public_key: str) -> bool:
-    # Expected format ed25519:base64
-    if not public_key.startswith("ed25519:"):
-        return False
-    b64 = public_key.split("ed25519:", 1)[1]
-    try:
-        base64.b64decode(b64, validate=True)
-        return True
-    except Exception:
-        return False
+    # Expected format ed25519:base64 of a 32-byte key (43 symbols plus one '=' pad)
+    return _ED25519_PUBKEY_RE.fullmatch(public_key) is not None
+
+@lru_cache(maxsize=4096)
+def _get_verify_key(pub_b64: str) -> "nacl.signing.VerifyKey":
+    # Decoded once per device key; repeat signatures skip the base64 and point decoding.
+    return nacl.signing.VerifyKey(base64.b64decode(pub_b64), encoder=nacl.encoding.RawEncoder)
 
 def validate_signature(pubkey: str, message: bytes, signature_b64: str) -> bool:
-    try:
-        import nacl.signing, nacl.encoding
-    except Exception:
+    if not _HAS_NACL:
         return False
     if not pubkey.startswith("ed25519:"):
         return False
     pub_b64 = pubkey.split("ed25519:", 1)[1]
     try:
-        verify_key = nacl.signing.VerifyKey(base64.b64decode(pub_b64), encoder=nacl.encoding.RawEncoder)
+        verify_key = _get_verify_key(pub_b64)
         sig = base64.b64decode(signature_b64.split("ed25519_sig:", 1)[1])
         verify_key.verify(message, sig)
         return True
@@ -56,7 +56,7 @@ class TestDeviceCheckClientInitialization:
         """Test client initializes with correct configuration"""
         assert devicecheck_client.key_id == "ABC1234567"
         assert devicecheck_client.team_id == "ABCD123456"
-        assert devicecheck_client.jwt_expiry_minutes == 5
+        assert devicecheck_client.jwt_expiry_minutes == 15
         assert devicecheck_client.max_retries == 3
     
     def test_private_key_not_found(self, devicecheck_config):
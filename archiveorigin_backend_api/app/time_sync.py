@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from threading import Lock
+from threading import Event, Lock, Thread
 from time import time
 from typing import Optional
 
@@ -10,22 +10,39 @@ import ntplib
 from config import settings
 
 class TrustedTime:
-    """Best-effort NTP backed clock with cached offset."""
+    """Best-effort NTP backed clock with cached offset.
+
+    A daemon thread, started on first use, refreshes the offset every `refresh_interval`
+    seconds, so `now()` never waits on the network; until the first sync it reads the
+    system clock.
+    """
 
     def __init__(self, refresh_interval: int = 60):
         self.refresh_interval = refresh_interval
         self._lock = Lock()
-        self._last_fetch: float = 0.0
         self._offset: float = 0.0
+        self._refresher: Optional[Thread] = None
+        self._stopped = Event()
 
     def now(self) -> datetime:
+        if self._refresher is None:
+            self._start_refresher()
+        return datetime.fromtimestamp(time() + self._offset, tz=timezone.utc)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _start_refresher(self) -> None:
         with self._lock:
-            current = time()
-            if current - self._last_fetch > self.refresh_interval:
-                self._refresh()
-                self._last_fetch = current
-            adjusted = current + self._offset
-        return datetime.fromtimestamp(adjusted, tz=timezone.utc)
+            if self._refresher is None:
+                refresher = Thread(target=self._refresh_loop, name="trusted-time-refresh", daemon=True)
+                refresher.start()
+                self._refresher = refresher
+
+    def _refresh_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._refresh()
+            self._stopped.wait(self.refresh_interval)
 
     def _refresh(self):
         client = ntplib.NTPClient()
@@ -1,6 +1,9 @@
-import random
+import secrets
 import string
 
+# 64 URL-safe symbols, so masking a random byte to 6 bits picks each one uniformly.
+_SHORTCODE_ALPHABET = (string.ascii_lowercase + string.ascii_uppercase + string.digits + "-_").encode("ascii")
+_SHORTCODE_TABLE = bytes(_SHORTCODE_ALPHABET[i & 0x3F] for i in range(256))
+
 def random_shortcode(length: int = 6) -> str:
-    alphabet = string.ascii_lowercase + string.ascii_uppercase + string.digits
-    return ''.join(random.choice(alphabet) for _ in range(length))
+    return secrets.token_bytes(length).translate(_SHORTCODE_TABLE).decode("ascii")
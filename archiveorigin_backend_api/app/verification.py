@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-import json
+import hmac
+import re
 from datetime import timedelta, timezone
 from threading import Lock
 from typing import Any, Dict, Optional
@@ -8,7 +9,7 @@ from typing import Any, Dict, Optional
 import orjson
 from cachetools import TTLCache
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import Connection, Row, Select, case, or_, select
 from sqlalchemy.orm import Session
 
 from auth import ClientIdentity
@@ -25,37 +26,49 @@ from schemas import (
 )
 from time_sync import trusted_time
 
-REPLAY_CACHE = TTLCache(maxsize=50_000, ttl=settings.replay_cache_ttl_seconds)
-REPLAY_LOCK = Lock()
-SUSPICIOUS_KEYS = {"media", "file", "binary", "payload", "image", "video", "audio", "blob"}
+# Replay digests are striped across independently locked shards to avoid one global lock.
+REPLAY_SHARD_COUNT = 16
+REPLAY_SHARDS = [
+    (TTLCache(maxsize=50_000 // REPLAY_SHARD_COUNT, ttl=settings.replay_cache_ttl_seconds), Lock())
+    for _ in range(REPLAY_SHARD_COUNT)
+]
+# Response schemas per ledger entry_id; the TTL bounds staleness if an entry is later rooted.
+ENTRY_SCHEMA_CACHE: TTLCache[str, LedgerEntrySchema] = TTLCache(maxsize=10_000, ttl=60)
+ENTRY_SCHEMA_LOCK = Lock()
+SUSPICIOUS_KEYS = frozenset({"media", "file", "binary", "payload", "image", "video", "audio", "blob"})
+INLINE_MEDIA_RE = re.compile(r"data:image|base64,", re.IGNORECASE)
 MAX_STRING_LENGTH = 512
+ALLOWED_SUMMARY_FIELDS = frozenset(settings.allowed_manifest_summary_fields)
 MAX_NOTES = 4
 
 def _raise_bad_request(message: str):
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=message)
 
 def ensure_payload_safe(payload_dict: Dict[str, Any]) -> None:
-    for key, value in payload_dict.items():
-        normalized_key = key.lower()
-        if normalized_key in SUSPICIOUS_KEYS:
-            _raise_bad_request("media_payload_not_allowed")
-        if isinstance(value, (bytes, bytearray)):
-            _raise_bad_request("binary_payload_not_allowed")
-        if isinstance(value, str):
-            if "data:image" in value.lower() or "base64," in value.lower():
+    # Iterative walk over nested dicts; each key and string is scanned once.
+    pending = [payload_dict]
+    while pending:
+        for key, value in pending.pop().items():
+            normalized_key = key.lower()
+            if normalized_key in SUSPICIOUS_KEYS:
                 _raise_bad_request("media_payload_not_allowed")
-            if len(value) > MAX_STRING_LENGTH and normalized_key not in {"manifest_summary"}:
-                _raise_bad_request("unexpected_field_size")
-        if isinstance(value, dict):
-            ensure_payload_safe(value)
+            if isinstance(value, str):
+                if INLINE_MEDIA_RE.search(value):
+                    _raise_bad_request("media_payload_not_allowed")
+                if len(value) > MAX_STRING_LENGTH and normalized_key != "manifest_summary":
+                    _raise_bad_request("unexpected_field_size")
+            elif isinstance(value, dict):
+                pending.append(value)
+            elif isinstance(value, (bytes, bytearray)):
+                _raise_bad_request("binary_payload_not_allowed")
 
 def validate_manifest_summary(summary: Optional[Dict[str, Any]], allow_summary: bool):
     if summary is None:
         return
     if not allow_summary:
         _raise_bad_request("manifest_summary_not_allowed")
-    forbidden = [key for key in summary.keys() if key not in settings.allowed_manifest_summary_fields]
-    if forbidden:
+    # Keys are unique, so more keys than allowed fields means at least one is disallowed.
+    if len(summary) > len(ALLOWED_SUMMARY_FIELDS) or not summary.keys() <= ALLOWED_SUMMARY_FIELDS:
         _raise_bad_request("manifest_summary_contains_disallowed_fields")
     encoded = orjson.dumps(summary)
     if len(encoded) > settings.manifest_summary_max_bytes:
@@ -65,21 +78,31 @@ def enforce_replay_guard(payload: VerifyRequest):
     digest = payload.content_hash
     if payload.client_nonce:
         digest = f"{payload.client_nonce}:{payload.content_hash}"
-    with REPLAY_LOCK:
-        if digest in REPLAY_CACHE:
+    cache, lock = REPLAY_SHARDS[hash(digest) & (REPLAY_SHARD_COUNT - 1)]
+    with lock:
+        if digest in cache:
             raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="replay_detected")
-        REPLAY_CACHE[digest] = True
+        cache[digest] = True
 
-def _load_merkle_proof(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+def _load_merkle_proof(raw: Any) -> Optional[Dict[str, Any]]:
+    # JSON columns arrive decoded; strings only appear on databases not yet migrated off TEXT.
     if not raw:
         return None
+    if not isinstance(raw, (str, bytes)):
+        return raw
     try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
         return None
 
-def _entry_to_schema(entry: LedgerEntry) -> LedgerEntrySchema:
-    return LedgerEntrySchema(
+# Response models below are built from server-side data, so they skip input validation
+# via model_construct(); FastAPI still checks them against response_model on the way out.
+def _entry_to_schema(entry: LedgerEntry | Row) -> LedgerEntrySchema:
+    with ENTRY_SCHEMA_LOCK:
+        cached = ENTRY_SCHEMA_CACHE.get(entry.entry_id)
+    if cached is not None:
+        return cached
+    schema = LedgerEntrySchema.model_construct(
         entry_id=entry.entry_id,
         timestamp=entry.timestamp_utc,
         attestation_cert_hash=entry.attestation_cert_hash,
@@ -89,38 +112,58 @@ def _entry_to_schema(entry: LedgerEntry) -> LedgerEntrySchema:
         merkle_proof=_load_merkle_proof(entry.merkle_proof),
         sourced_from=entry.sourced_from,
     )
+    with ENTRY_SCHEMA_LOCK:
+        ENTRY_SCHEMA_CACHE[entry.entry_id] = schema
+    return schema
 
-def lookup_ledger(db: Session, payload: VerifyRequest) -> Optional[LedgerEntry]:
-    stmt = select(LedgerEntry).where(LedgerEntry.content_hash == payload.content_hash)
-    entry = db.execute(stmt).scalar_one_or_none()
-    if entry:
-        return entry
+def clear_entry_schema_cache() -> None:
+    with ENTRY_SCHEMA_LOCK:
+        ENTRY_SCHEMA_CACHE.clear()
+
+def _ledger_match_stmt(payload: VerifyRequest, *entities) -> Select:
+    # One round-trip: match any supplied hash, preferring content, then manifest, then signature.
+    matches = [LedgerEntry.content_hash == payload.content_hash]
     if payload.manifest_hash:
-        stmt = select(LedgerEntry).where(LedgerEntry.manifest_hash == payload.manifest_hash)
-        entry = db.execute(stmt).scalar_one_or_none()
-        if entry:
-            return entry
+        matches.append(LedgerEntry.manifest_hash == payload.manifest_hash)
     if payload.signature_hash:
-        stmt = select(LedgerEntry).where(LedgerEntry.device_signature_hash == payload.signature_hash)
-        return db.execute(stmt).scalar_one_or_none()
-    return None
+        matches.append(LedgerEntry.device_signature_hash == payload.signature_hash)
+    stmt = select(*entities).where(or_(*matches))
+    if len(matches) > 1:
+        stmt = stmt.order_by(case(*((match, rank) for rank, match in enumerate(matches)), else_=len(matches)))
+    return stmt.limit(1)
+
+def lookup_ledger(db: Session, payload: VerifyRequest) -> Optional[LedgerEntry]:
+    return db.execute(_ledger_match_stmt(payload, LedgerEntry)).scalar_one_or_none()
+
+def _lookup_ledger_with_cert(db: Session | Connection, payload: VerifyRequest) -> Optional[tuple[Row, Optional[bool]]]:
+    """Fetch the best ledger match and its certificate's revoked flag (None if the cert is missing).
 
-def _verify_attestation(db: Session, payload: VerifyRequest, entry: LedgerEntry, notes: list[str]) -> bool:
-    if payload.attestation_cert_hash != entry.attestation_cert_hash:
+    Selects table columns rather than the mapped entity, so a plain Connection works as well as
+    a Session and the read-only verify path builds no ORM instances.
+    """
+    stmt = _ledger_match_stmt(payload, LedgerEntry.__table__, AttestationCertificate.revoked).outerjoin(
+        AttestationCertificate, AttestationCertificate.cert_hash == LedgerEntry.attestation_cert_hash
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        return None
+    return row, row.revoked
+
+def _verify_attestation(payload: VerifyRequest, entry: Row, cert_revoked: Optional[bool], notes: list[str]) -> bool:
+    if not hmac.compare_digest(payload.attestation_cert_hash, entry.attestation_cert_hash):
         notes.append("attestation hash mismatch")
         return False
-    cert = db.get(AttestationCertificate, entry.attestation_cert_hash)
-    if cert is None:
+    if cert_revoked is None:
         notes.append("certificate_missing")
         return False
-    if cert.revoked:
+    if cert_revoked:
         notes.append("certificate_revoked")
         return False
     return True
 
-def _verify_signature(payload: VerifyRequest, entry: LedgerEntry, notes: list[str]) -> bool:
+def _verify_signature(payload: VerifyRequest, entry: Row, notes: list[str]) -> bool:
     if entry.device_signature_hash and payload.signature_hash:
-        if entry.device_signature_hash != payload.signature_hash:
+        if not hmac.compare_digest(entry.device_signature_hash, payload.signature_hash):
             notes.append("signature_hash_mismatch")
             return False
         return True
@@ -130,13 +173,13 @@ def _verify_signature(payload: VerifyRequest, entry: LedgerEntry, notes: list[st
     # If ledger stored no signature hash, treat as unknown but not blocking
     return True
 
-def _verify_manifest(payload: VerifyRequest, entry: LedgerEntry, notes: list[str]) -> bool:
-    if payload.manifest_hash and entry.manifest_hash and payload.manifest_hash != entry.manifest_hash:
+def _verify_manifest(payload: VerifyRequest, entry: Row, notes: list[str]) -> bool:
+    if payload.manifest_hash and entry.manifest_hash and not hmac.compare_digest(payload.manifest_hash, entry.manifest_hash):
         notes.append("manifest_hash_mismatch")
         return False
     return True
 
-def _verify_timestamp(entry: LedgerEntry, notes: list[str]) -> bool:
+def _verify_timestamp(entry: Row, notes: list[str]) -> bool:
     trusted_now = trusted_time.now()
     timestamp = entry.timestamp_utc
     if timestamp and timestamp.tzinfo is None:
@@ -147,29 +190,31 @@ def _verify_timestamp(entry: LedgerEntry, notes: list[str]) -> bool:
         return False
     return True
 
-def perform_verification(payload: VerifyRequest, identity: ClientIdentity, db: Session):
-    ensure_payload_safe(payload.model_dump())
+def perform_verification(payload: VerifyRequest, identity: ClientIdentity, db: Session | Connection):
+    # Shallow view of the fields; model_dump() would deep-copy manifest_summary just to scan it.
+    ensure_payload_safe({name: getattr(payload, name) for name in type(payload).model_fields})
     validate_manifest_summary(payload.manifest_summary, identity.allow_manifest_summary)
     enforce_replay_guard(payload)
 
-    entry = lookup_ledger(db, payload)
-    if not entry:
-        return VerifyFailureResponse(
+    match = _lookup_ledger_with_cert(db, payload)
+    if match is None:
+        return VerifyFailureResponse.model_construct(
             status="not_verified",
             reason="ledger_not_found",
-            details=VerifyFailureDetails(
+            details=VerifyFailureDetails.model_construct(
                 ledger_found=False,
                 signature_valid=False,
                 attestation_valid=False,
             ),
         )
 
+    entry, cert_revoked = match
     notes: list[str] = []
-    ledger_match = entry.content_hash == payload.content_hash
+    ledger_match = hmac.compare_digest(entry.content_hash, payload.content_hash)
     if not ledger_match:
         notes.append("content_hash_mismatch")
 
-    attestation_ok = _verify_attestation(db, payload, entry, notes)
+    attestation_ok = _verify_attestation(payload, entry, cert_revoked, notes)
     signature_ok = _verify_signature(payload, entry, notes)
     manifest_ok = _verify_manifest(payload, entry, notes)
     timestamp_ok = _verify_timestamp(entry, notes)
@@ -182,10 +227,10 @@ def perform_verification(payload: VerifyRequest, identity: ClientIdentity, db: S
             reason = "signature_mismatch"
         elif not timestamp_ok:
             reason = "timestamp_mismatch"
-        return VerifyFailureResponse(
+        return VerifyFailureResponse.model_construct(
             status="not_verified",
             reason=reason,
-            details=VerifyFailureDetails(
+            details=VerifyFailureDetails.model_construct(
                 ledger_found=True,
                 signature_valid=signature_ok and manifest_ok,
                 attestation_valid=attestation_ok,
@@ -193,15 +238,15 @@ def perform_verification(payload: VerifyRequest, identity: ClientIdentity, db: S
         )
 
     expires_at = trusted_time.now() + timedelta(minutes=5)
-    details = VerificationDetails(
+    details = VerificationDetails.model_construct(
         signature_valid=True,
         attestation_valid=True,
         ledger_match=True,
-        notes=notes[:MAX_NOTES] if notes else ["Ledger entry matched."],
+        notes=tuple(notes[:MAX_NOTES]) if notes else ("Ledger entry matched.",),
     )
     ledger_schema = _entry_to_schema(entry)
     proof_level = entry.proof_level if entry.proof_level in {"basic", "attested", "rooted"} else "basic"
-    return VerifySuccessResponse(
+    return VerifySuccessResponse.model_construct(
         status="verified",
         content_hash=payload.content_hash,
         ledger_entry=ledger_schema,
@@ -214,4 +259,4 @@ def perform_ledger_lookup(payload: VerifyRequest, db: Session) -> LedgerLookupRe
     entry = lookup_ledger(db, payload)
     if not entry:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ledger_not_found")
-    return LedgerLookupResponse(status="ok", ledger_entry=_entry_to_schema(entry))
+    return LedgerLookupResponse.model_construct(status="ok", ledger_entry=_entry_to_schema(entry))
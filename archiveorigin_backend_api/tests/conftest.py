@@ -8,3 +8,62 @@ paths = [str(APP_DIR), str(ROOT)]
 for p in paths:
     if p not in sys.path:
         sys.path.insert(0, p)
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "db: test uses the shared in-memory database (db_session)")
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """One in-memory SQLite schema for the whole run; tests isolate via db_session."""
+    # StaticPool keeps the single :memory: connection (and its schema) for every checkout.
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+
+    # pysqlite defers BEGIN on its own, which breaks SAVEPOINT nesting; emit it ourselves.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, _record):
+        dbapi_connection.isolation_level = None
+        # The database dies with the process, so skip durability work on every commit.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(request, db_engine):
+    """Session inside an outer transaction; test commits become savepoints rolled back at teardown."""
+    # Keeps `-m "not db"` honest: only marked tests may pull the engine in.
+    if request.node.get_closest_marker("db") is None:
+        pytest.fail("tests using db_session must be marked with @pytest.mark.db")
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
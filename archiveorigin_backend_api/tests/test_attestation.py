@@ -1,22 +1,18 @@
 from datetime import datetime, timedelta, timezone
 
+import asyncio
 import json
+import httpx
 import pytest
 from cryptography import x509
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.x509 import NameOID
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 from app import attestation, crl
-from app.models import Base, AttestationCertificate
+from app.models import AttestationCertificate
 
-
-def _in_memory_session():
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine, future=True)
+pytestmark = pytest.mark.db
 
 
 def _generate_cert_and_crl():
@@ -59,31 +55,127 @@ def _generate_cert_and_crl():
     return cert.public_bytes(serialization.Encoding.PEM).decode(), crl_bytes
 
 
-def test_ingest_certificate_extracts_metadata():
-    Session = _in_memory_session()
+def test_ingest_certificate_extracts_metadata(db_session):
     pem, _ = _generate_cert_and_crl()
-    with Session() as session:
-        record = attestation.ingest_certificate(pem, metadata={"env": "test"}, db=session)
-        session.commit()
-        assert record.cert_hash
-        assert record.serial_number
-        assert record.issuer.startswith("CN")
+    record = attestation.ingest_certificate(pem, metadata={"env": "test"}, db=db_session)
+    db_session.commit()
+    assert record.cert_hash
+    assert record.serial_number
+    assert record.issuer.startswith("CN")
+
+
+def test_crl_refresh_marks_revoked(db_session, monkeypatch):
+    pem, crl_bytes = _generate_cert_and_crl()
+    record = attestation.ingest_certificate(pem, metadata=None, db=db_session)
+    record.crl_urls = json.dumps(["mock://crl"])
+    db_session.commit()
+    cert_hash = record.cert_hash
+
+    monkeypatch.setattr(crl, "_collect_urls", lambda db: {"mock://crl"})
+    async def _fake_fetch(client, url):
+        return crl_bytes
+
+    monkeypatch.setattr(crl, "_fetch", _fake_fetch)
+
+    result = crl.refresh_crls(db_session)
+    assert result["revoked"] == 1
+    refreshed = db_session.get(AttestationCertificate, cert_hash)
+    assert refreshed.revoked is True
+    assert refreshed.last_checked_at is not None
+
+    assert crl.refresh_crls(db_session)["revoked"] == 0
+
+
+def test_crl_refresh_runs_inside_event_loop(db_session, monkeypatch):
+    pem, crl_bytes = _generate_cert_and_crl()
+    cert_hash = attestation.ingest_certificate(pem, metadata=None, db=db_session).cert_hash
+    db_session.commit()
+
+    async def _fake_fetch(client, url):
+        return crl_bytes
+
+    monkeypatch.setattr(crl, "_collect_urls", lambda db: {"mock://crl"})
+    monkeypatch.setattr(crl, "_fetch", _fake_fetch)
+
+    # Mirrors startup under uvicorn, which imports main (and refreshes CRLs) from its loop.
+    async def _startup():
+        return crl.refresh_crls(db_session)
+
+    assert asyncio.run(_startup()) == {"checked": 1, "revoked": 1}
+    assert db_session.get(AttestationCertificate, cert_hash).revoked is True
 
 
-def test_crl_refresh_marks_revoked(monkeypatch):
-    Session = _in_memory_session()
+def test_crl_refresh_skips_failed_fetches(db_session, monkeypatch):
     pem, crl_bytes = _generate_cert_and_crl()
-    with Session() as session:
-        record = attestation.ingest_certificate(pem, metadata=None, db=session)
-        record.crl_urls = json.dumps(["mock://crl"])
-        session.commit()
-        cert_hash = record.cert_hash
+    attestation.ingest_certificate(pem, metadata=None, db=db_session)
+    db_session.commit()
+
+    async def _fake_fetch(client, url):
+        if url == "mock://down":
+            raise httpx.ConnectError("unreachable")
+        return crl_bytes
+
+    monkeypatch.setattr(crl, "_collect_urls", lambda db: {"mock://crl", "mock://down"})
+    monkeypatch.setattr(crl, "_fetch", _fake_fetch)
+
+    result = crl.refresh_crls(db_session)
+    assert result == {"checked": 1, "revoked": 1}
+
+
+def test_ingest_certificates_from_dir_handles_bundles_and_der(db_session, tmp_path):
+    first_pem, _ = _generate_cert_and_crl()
+    second_pem, _ = _generate_cert_and_crl()
+    third_pem, _ = _generate_cert_and_crl()
+    (tmp_path / "bundle.pem").write_text(first_pem + second_pem)
+    der = x509.load_pem_x509_certificate(third_pem.encode()).public_bytes(serialization.Encoding.DER)
+    (tmp_path / "single.cer").write_bytes(der)
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    ingested = attestation.ingest_certificates_from_dir(str(tmp_path), db_session)
+    db_session.commit()
+    assert len(set(ingested)) == 3
+    stored = db_session.get(AttestationCertificate, attestation.sha256_hex(der))
+    assert stored.pem.strip() == third_pem.strip()
+
+
+def test_collect_urls_tracks_new_certificates(db_session):
+    first_pem, _ = _generate_cert_and_crl()
+    attestation.ingest_certificate(first_pem, metadata=None, db=db_session)
+    db_session.commit()
+    assert crl._collect_urls(db_session) == {"mock://crl"}
+
+    record = attestation.ingest_certificate(_generate_cert_and_crl()[0], metadata=None, db=db_session)
+    record.crl_urls = json.dumps(["mock://other"])
+    db_session.commit()
+    assert crl._collect_urls(db_session) == {"mock://crl", "mock://other"}
+
+
+def test_crl_refresh_matches_non_canonical_serials(db_session, monkeypatch):
+    pem, crl_bytes = _generate_cert_and_crl()
+    record = attestation.ingest_certificate(pem, metadata=None, db=db_session)
+    record.serial_number = "00" + record.serial_number.lower()
+    db_session.commit()
+    cert_hash = record.cert_hash
+
+    async def _fake_fetch(client, url):
+        return crl_bytes
 
     monkeypatch.setattr(crl, "_collect_urls", lambda db: {"mock://crl"})
-    monkeypatch.setattr(crl, "_fetch", lambda url: crl_bytes)
+    monkeypatch.setattr(crl, "_fetch", _fake_fetch)
+
+    assert crl.refresh_crls(db_session)["revoked"] == 1
+    assert db_session.get(AttestationCertificate, cert_hash).revoked is True
+
+
+def test_ingest_certificates_from_dir_deduplicates_copies(db_session, tmp_path):
+    db_session.autoflush = False
+    pem, _ = _generate_cert_and_crl()
+    for sub in ("a", "b"):
+        (tmp_path / sub).mkdir()
+        (tmp_path / sub / "cert.pem").write_text(pem)
 
-    with Session() as session:
-        result = crl.refresh_crls(session)
-        assert result["revoked"] == 1
-        refreshed = session.get(AttestationCertificate, cert_hash)
-        assert refreshed.revoked is True
+    ingested = attestation.ingest_certificates_from_dir(str(tmp_path), db_session)
+    db_session.commit()
+    assert len(ingested) == 2
+    assert len(set(ingested)) == 1
+    assert db_session.query(AttestationCertificate).count() == 1
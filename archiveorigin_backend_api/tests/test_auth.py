@@ -0,0 +1,59 @@
+import dataclasses
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth
+from config import Settings
+
+API_KEY = "test-key"
+SECRET = "s3cret"
+CONTENT_HASH = "a" * 64
+
+
+@pytest.fixture
+def keyed_settings(monkeypatch):
+    configured = Settings(
+        verifier_api_keys=json.dumps(
+            [{"key": API_KEY, "name": "partner", "hmac_secret": SECRET, "rate_limit_per_minute": 42}]
+        )
+    )
+    monkeypatch.setattr(auth, "settings", configured)
+    return configured
+
+
+def _signed_headers(timestamp: int, content_hash: str = CONTENT_HASH, secret: str = SECRET):
+    message = f"{timestamp}:{content_hash}".encode("utf-8")
+    signature = hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+    return {"x-api-key": API_KEY, "X-Api-Timestamp": str(timestamp), "X-Api-Signature": signature}
+
+
+def test_authenticate_request_accepts_valid_signature(keyed_settings):
+    identity = auth.authenticate_request(_signed_headers(int(time.time())), CONTENT_HASH)
+    assert identity.authenticated is True
+    assert identity.name == "partner"
+    assert identity.rate_limit == 42
+
+
+def test_authenticate_request_rejects_bad_signature(keyed_settings):
+    headers = _signed_headers(int(time.time()), secret="wrong")
+    with pytest.raises(HTTPException) as excinfo:
+        auth.authenticate_request(headers, CONTENT_HASH)
+    assert excinfo.value.detail == "invalid_signature"
+
+
+def test_authenticate_request_anonymous_without_key(keyed_settings):
+    identity = auth.authenticate_request({}, CONTENT_HASH)
+    assert identity.authenticated is False
+    assert identity.api_key is None
+
+
+def test_anonymous_identity_is_shared_and_frozen(keyed_settings):
+    first = auth.authenticate_request({}, CONTENT_HASH)
+    assert auth.authenticate_request({}, CONTENT_HASH) is first
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.rate_limit = 1000
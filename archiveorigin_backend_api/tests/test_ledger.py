@@ -0,0 +1,142 @@
+import hashlib
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+
+from app import ledger
+from app.merkle import compute_merkle_root
+from app.models import CaptureRecord
+
+pytestmark = pytest.mark.db
+
+
+@pytest.fixture
+def ledger_session(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(ledger.settings, "ledger_repo_root", str(tmp_path / "ledger"))
+    return db_session
+
+
+def _add_records(session, count):
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    hashes = ["sha256:" + hashlib.sha256(f"asset-{idx}".encode()).hexdigest() for idx in range(count)]
+    session.add_all(
+        CaptureRecord(
+            record_id=f"rec-{idx}",
+            asset_hash=asset_hash,
+            capture_time_utc=base + timedelta(minutes=idx),
+            device_id="dev-1",
+            created_at_utc=base + timedelta(seconds=idx),
+        )
+        for idx, asset_hash in enumerate(hashes)
+    )
+    session.commit()
+    return hashes
+
+
+def test_seal_pending_records_writes_artifacts(ledger_session):
+    hashes = _add_records(ledger_session, 3)
+
+    result = ledger.seal_pending_records(ledger_session)
+
+    assert result is not None
+    assert result.record_count == 3
+    assert result.root_hash == compute_merkle_root(hashes)
+    batch_path, index_path, roots_csv, proof_manifest = result.artifacts
+
+    batch = orjson.loads(batch_path.read_bytes())
+    assert batch["root_hash"] == result.root_hash
+    assert [rec["record_id"] for rec in batch["records"]] == ["rec-0", "rec-1", "rec-2"]
+    assert batch["merkle_tree_levels"][0] == hashes
+
+    assert index_path.suffix == ".jsonl"
+    journal = [orjson.loads(line) for line in index_path.read_bytes().splitlines()]
+    assert journal[-1]["batch_id"] == result.batch_id
+
+    csv_lines = roots_csv.read_text().splitlines()
+    assert csv_lines[0] == "sealed_at_utc,root_hash,batch_id,record_count"
+    assert csv_lines[-1].endswith(f",{result.root_hash},{result.batch_id},3")
+
+    manifest_lines = proof_manifest.read_bytes().splitlines()
+    assert orjson.loads(manifest_lines[-1])["batch_id"] == result.batch_id
+
+    sealed = ledger_session.get(CaptureRecord, "rec-1")
+    assert sealed.merkle_batch_id == result.batch_id
+    assert sealed.merkle_root_hash == result.root_hash
+
+
+def test_seal_pending_records_skips_sealed(ledger_session):
+    _add_records(ledger_session, 2)
+    assert ledger.seal_pending_records(ledger_session) is not None
+    assert ledger.seal_pending_records(ledger_session) is None
+
+
+def test_seal_marks_every_record_across_update_chunks(ledger_session, monkeypatch):
+    monkeypatch.setattr(ledger, "_SEAL_UPDATE_CHUNK", 2)
+    _add_records(ledger_session, 5)
+
+    result = ledger.seal_pending_records(ledger_session)
+
+    batch_ids = {ledger_session.get(CaptureRecord, f"rec-{idx}").merkle_batch_id for idx in range(5)}
+    assert batch_ids == {result.batch_id}
+    assert ledger.seal_pending_records(ledger_session) is None
+
+
+def test_rebuild_root_index_seeds_from_legacy_json(ledger_session, tmp_path):
+    roots_dir = tmp_path / "ledger" / ledger.settings.ledger_roots_subdir
+    roots_dir.mkdir(parents=True)
+    legacy = [{"batch_id": "legacy", "sealed_at_utc": "2024-01-01T00:00:00+00:00", "root_hash": "sha256:" + "0" * 64}]
+    (roots_dir / ledger.settings.ledger_root_index_filename).write_bytes(orjson.dumps(legacy))
+    _add_records(ledger_session, 1)
+    result = ledger.seal_pending_records(ledger_session)
+
+    index_path = ledger.rebuild_root_index()
+
+    index = orjson.loads(index_path.read_bytes())
+    assert [entry["batch_id"] for entry in index] == ["legacy", result.batch_id]
+
+
+def test_seal_commits_to_git_and_reports_head(ledger_session, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name, value in {
+        "GIT_AUTHOR_NAME": "ledger",
+        "GIT_AUTHOR_EMAIL": "ledger@example.invalid",
+        "GIT_COMMITTER_NAME": "ledger",
+        "GIT_COMMITTER_EMAIL": "ledger@example.invalid",
+    }.items():
+        monkeypatch.setenv(name, value)
+    subprocess.run(["git", "init", "-q"], check=True)
+    _add_records(ledger_session, 2)
+
+    result = ledger.seal_pending_records(ledger_session, commit_to_git=True)
+
+    head = subprocess.run(["git", "rev-parse", "HEAD"], check=True, capture_output=True, text=True).stdout.strip()
+    assert result.git_commit_sha == head
+    tracked = subprocess.run(["git", "ls-files"], check=True, capture_output=True, text=True).stdout.split()
+    assert len(tracked) == len(result.artifacts)
+
+
+def test_seal_pending_records_skips_records_without_hash(ledger_session):
+    hashes = _add_records(ledger_session, 2)
+    ledger_session.add(CaptureRecord(record_id="rec-empty", asset_hash=""))
+    ledger_session.add(CaptureRecord(record_id="rec-none", asset_hash=None))
+    ledger_session.commit()
+
+    result = ledger.seal_pending_records(ledger_session)
+
+    assert result.record_count == 2
+    assert result.root_hash == compute_merkle_root(hashes)
+    assert ledger_session.get(CaptureRecord, "rec-empty").merkle_batch_id is None
+
+
+def test_roots_csv_header_written_once_across_seals(ledger_session):
+    _add_records(ledger_session, 2)
+    first = ledger.seal_pending_records(ledger_session)
+    ledger_session.add(CaptureRecord(record_id="rec-late", asset_hash="sha256:" + "b" * 64))
+    ledger_session.commit()
+    second = ledger.seal_pending_records(ledger_session)
+
+    csv_lines = first.artifacts[2].read_text().splitlines()
+    assert csv_lines[0] == "sealed_at_utc,root_hash,batch_id,record_count"
+    assert [line.split(",")[2] for line in csv_lines[1:]] == [first.batch_id, second.batch_id]
@@ -0,0 +1,68 @@
+import hashlib
+
+import pytest
+
+from app.merkle import MerkleComputationError, build_merkle_tree, compute_merkle_root
+
+
+def _leaf(seed: str) -> str:
+    return "sha256:" + hashlib.sha256(seed.encode("utf-8")).hexdigest()
+
+
+def _reference_root(leaves):
+    # Ledger format: parents hash the concatenated lowercase hex of their children.
+    level = [leaf.split("sha256:", 1)[1].lower() for leaf in leaves]
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level = level + [level[-1]]
+        level = [
+            hashlib.sha256((level[i] + level[i + 1]).encode("utf-8")).hexdigest()
+            for i in range(0, len(level), 2)
+        ]
+    return "sha256:" + level[0]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 5, 8, 13])
+def test_roots_match_ledger_format(count):
+    leaves = [_leaf(str(i)) for i in range(count)]
+    expected = _reference_root(leaves)
+    assert compute_merkle_root(leaves) == expected
+    root, levels = build_merkle_tree(leaves)
+    assert root == expected
+    assert levels[0] == tuple(leaf[len("sha256:"):] for leaf in leaves)
+    assert levels[-1] == (expected[len("sha256:"):],)
+
+
+def test_uppercase_leaves_are_normalized():
+    leaf = _leaf("x")
+    assert compute_merkle_root([leaf.upper().replace("SHA256:", "sha256:")]) == leaf
+
+
+def test_rejects_bad_leaves():
+    with pytest.raises(MerkleComputationError):
+        compute_merkle_root([])
+    with pytest.raises(MerkleComputationError):
+        compute_merkle_root(["md5:" + "0" * 64])
+    with pytest.raises(MerkleComputationError):
+        build_merkle_tree(["sha256:abc"])
+
+
+@pytest.mark.parametrize(
+    "leaf",
+    [
+        pytest.param("sha256:" + "a" * 57, id="prefixed-short-digest"),
+        pytest.param("z" * 64, id="non-hex"),
+        pytest.param("sha256:" + "g" * 64, id="prefixed-non-hex"),
+        pytest.param(b"z" * 64, id="non-hex-bytes"),
+    ],
+)
+def test_rejects_malformed_digests(leaf):
+    with pytest.raises(MerkleComputationError):
+        compute_merkle_root([leaf])
+
+
+def test_bare_and_bytes_leaves_match_prefixed():
+    leaves = [_leaf(str(i)) for i in range(5)]
+    bare = [leaf[len("sha256:"):] for leaf in leaves]
+    assert compute_merkle_root(bare) == compute_merkle_root(leaves)
+    assert compute_merkle_root([leaf.encode() for leaf in bare]) == compute_merkle_root(leaves)
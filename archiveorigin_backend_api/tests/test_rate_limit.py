@@ -0,0 +1,22 @@
+from app import rate_limit
+from app.rate_limit import RateLimiter
+
+
+def test_burst_up_to_limit_then_rejects(monkeypatch):
+    monkeypatch.setattr(rate_limit, "time", lambda: 1000.0)
+    limiter = RateLimiter(window_seconds=60)
+    assert all(limiter.hit("client", 3) for _ in range(3))
+    assert limiter.hit("client", 3) is False
+    assert limiter.hit("other", 3) is True
+
+
+def test_tokens_refill_over_the_window(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(rate_limit, "time", lambda: now)
+    limiter = RateLimiter(window_seconds=60)
+    assert all(limiter.hit("client", 2) for _ in range(2))
+    assert limiter.hit("client", 2) is False
+
+    now += 30  # half a window refills one of the two tokens
+    assert limiter.hit("client", 2) is True
+    assert limiter.hit("client", 2) is False
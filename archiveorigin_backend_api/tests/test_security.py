@@ -0,0 +1,33 @@
+import base64
+
+import nacl.signing
+
+from app.security import validate_pubkey_format, validate_signature
+
+
+def _signed(message: bytes):
+    key = nacl.signing.SigningKey.generate()
+    pubkey = "ed25519:" + base64.b64encode(bytes(key.verify_key)).decode()
+    signature = "ed25519_sig:" + base64.b64encode(key.sign(message).signature).decode()
+    return pubkey, signature
+
+
+def test_validate_signature_accepts_repeat_signatures_from_same_key():
+    pubkey, signature = _signed(b"hash|time")
+    assert validate_signature(pubkey, b"hash|time", signature) is True
+    assert validate_signature(pubkey, b"hash|time", signature) is True
+
+
+def test_validate_signature_rejects_tampered_message_and_bad_key():
+    pubkey, signature = _signed(b"hash|time")
+    assert validate_signature(pubkey, b"hash|other", signature) is False
+    assert validate_signature("ed25519:" + base64.b64encode(b"short").decode(), b"hash|time", signature) is False
+
+
+def test_validate_pubkey_format_requires_32_byte_ed25519_key():
+    pubkey, _ = _signed(b"x")
+    assert validate_pubkey_format(pubkey) is True
+    assert validate_pubkey_format("ed25519:AAA") is False
+    assert validate_pubkey_format("ed25519:" + pubkey[len("ed25519:"):-1]) is False
+    assert validate_pubkey_format(pubkey.replace("ed25519:", "rsa:")) is False
+    assert validate_pubkey_format(pubkey + "\n") is False
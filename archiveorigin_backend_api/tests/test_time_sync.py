@@ -0,0 +1,41 @@
+from threading import Event
+
+from app.time_sync import TrustedTime
+
+
+def test_now_never_waits_for_refresh_and_applies_offset(monkeypatch):
+    clock = TrustedTime(refresh_interval=60)
+    release = Event()
+    refreshed = Event()
+
+    def slow_refresh():
+        release.wait(5)
+        clock._offset = 5.0
+        refreshed.set()
+
+    monkeypatch.setattr(clock, "_refresh", slow_refresh)
+    try:
+        before = clock.now()  # returns while the refresher is still blocked
+        assert not refreshed.is_set()
+        release.set()
+        assert refreshed.wait(5)
+        assert (clock.now() - before).total_seconds() >= 5.0
+    finally:
+        clock.stop()
+        release.set()
+
+
+def test_refresher_thread_is_started_once(monkeypatch):
+    clock = TrustedTime(refresh_interval=60)
+    refreshed = Event()
+    monkeypatch.setattr(clock, "_refresh", refreshed.set)
+    try:
+        clock.now()
+        thread = clock._refresher
+        clock.now()
+        assert clock._refresher is thread
+        assert refreshed.wait(5)
+    finally:
+        clock.stop()
+    thread.join(5)
+    assert not thread.is_alive()
@@ -1,84 +1,196 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
 
 from app.auth import ClientIdentity
-from app.models import Base, LedgerEntry, AttestationCertificate
+from app.models import LedgerEntry, AttestationCertificate
 from app.schemas import VerifyRequest
-from app.verification import perform_verification
+from app import verification
+from app.verification import enforce_replay_guard, lookup_ledger, perform_verification
+
+pytestmark = pytest.mark.db
 
 CONTENT_HASH = "a" * 64
 MANIFEST_HASH = "b" * 64
 CERT_HASH = "c" * 64
 SIGNATURE_HASH = "d" * 64
+ENTRY_HASH = "e" * 64
+# Ledger timestamps only need to be in the past relative to trusted time.
+_FIXED_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def _clear_entry_schema_cache():
+    verification.clear_entry_schema_cache()
+    yield
+    verification.clear_entry_schema_cache()
 
 
-def _session_factory():
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine, future=True)
+_IDENTITY = ClientIdentity(api_key=None, name="anon", authenticated=False, rate_limit=10, allow_manifest_summary=False)
+_BASE_VERIFY_REQUEST = VerifyRequest(
+    content_hash=CONTENT_HASH,
+    manifest_hash=MANIFEST_HASH,
+    attestation_cert_hash=CERT_HASH,
+    signature_hash=SIGNATURE_HASH,
+)
 
 
 def _identity():
-    return ClientIdentity(api_key=None, name="anon", authenticated=False, rate_limit=10, allow_manifest_summary=False)
+    return _IDENTITY
 
 
 def _verify_request(nonce: str = "nonce-123"):
-    return VerifyRequest(
+    # Validated once above; each test only swaps in its own replay nonce.
+    return _BASE_VERIFY_REQUEST.model_copy(update={"client_nonce": nonce})
+
+
+@pytest.fixture(scope="session")
+def seed_rows():
+    """Column values for the certificate and ledger entry most flow tests verify against."""
+    return {
+        "cert": {
+            "cert_hash": CERT_HASH,
+            "revoked": False,
+            "created_at_utc": _FIXED_NOW,
+            "serial_number": "1234ABC",
+            "issuer": "CN=ArchiveOrigin Test",
+        },
+        "entry": {
+            "entry_id": "entry-1",
+            "content_hash": CONTENT_HASH,
+            "manifest_hash": MANIFEST_HASH,
+            "device_signature_hash": SIGNATURE_HASH,
+            "attestation_cert_hash": CERT_HASH,
+            "timestamp_utc": _FIXED_NOW,
+            "proof_level": "rooted",
+            "merkle_root": "merkleRoot",
+            "entry_hash": ENTRY_HASH,
+            "created_at_utc": _FIXED_NOW,
+            "sourced_from": "test",
+        },
+    }
+
+
+@pytest.fixture
+def seeded_session(db_session, seed_rows):
+    db_session.execute(insert(AttestationCertificate), [seed_rows["cert"]])
+    db_session.execute(insert(LedgerEntry), [seed_rows["entry"]])
+    db_session.commit()
+    return db_session
+
+
+@pytest.mark.parametrize("nonce", ["nonce-success", "n", "x" * 128])
+def test_perform_verification_success(seeded_session, nonce):
+    result = perform_verification(_verify_request(nonce), _identity(), seeded_session)
+    assert result.status == "verified"
+    assert result.verification_details.signature_valid is True
+    assert result.proof_level == "rooted"
+
+
+def test_perform_verification_ledger_miss(db_engine):
+    # Verification is read-only, so a bare Core connection stands in for a Session.
+    with db_engine.connect() as connection:
+        result = perform_verification(_verify_request("nonce-miss"), _identity(), connection)
+    assert result.status == "not_verified"
+    assert result.reason == "ledger_not_found"
+
+
+def test_enforce_replay_guard_rejects_repeated_nonce():
+    request = _verify_request("nonce-replay")
+    enforce_replay_guard(request)
+    with pytest.raises(HTTPException) as excinfo:
+        enforce_replay_guard(request)
+    assert excinfo.value.status_code == 429
+    enforce_replay_guard(_verify_request("nonce-replay-other"))
+
+
+def test_lookup_ledger_prefers_content_hash_over_fallbacks(seeded_session):
+    now = _FIXED_NOW
+    seeded_session.add(
+        LedgerEntry(
+            entry_id="entry-2",
+            content_hash="f" * 64,
+            manifest_hash=MANIFEST_HASH,
+            device_signature_hash=None,
+            attestation_cert_hash=CERT_HASH,
+            timestamp_utc=now,
+            proof_level="basic",
+            entry_hash="9" * 64,
+            created_at_utc=now,
+        )
+    )
+    seeded_session.commit()
+
+    by_content = VerifyRequest(content_hash="f" * 64, manifest_hash=MANIFEST_HASH, attestation_cert_hash=CERT_HASH)
+    assert lookup_ledger(seeded_session, by_content).entry_id == "entry-2"
+
+    by_signature = VerifyRequest(content_hash="0" * 64, signature_hash=SIGNATURE_HASH, attestation_cert_hash=CERT_HASH)
+    assert lookup_ledger(seeded_session, by_signature).entry_id == "entry-1"
+
+    miss = VerifyRequest(content_hash="0" * 64, attestation_cert_hash=CERT_HASH)
+    assert lookup_ledger(seeded_session, miss) is None
+
+
+def test_perform_verification_rejects_inline_media_in_summary(db_session):
+    request = VerifyRequest(
         content_hash=CONTENT_HASH,
-        manifest_hash=MANIFEST_HASH,
         attestation_cert_hash=CERT_HASH,
-        signature_hash=SIGNATURE_HASH,
-        client_nonce=nonce,
+        manifest_summary={"title": "data:image/png;base64,AAAA"},
     )
+    with pytest.raises(HTTPException) as excinfo:
+        perform_verification(request, _identity(), db_session)
+    assert excinfo.value.detail == "media_payload_not_allowed"
 
 
-def _insert_records(session):
-    now = datetime.now(timezone.utc)
-    cert = AttestationCertificate(
-        cert_hash=CERT_HASH,
-        pem=None,
-        metadata_json=None,
-        revoked=False,
-        created_at_utc=now,
-        serial_number="1234ABC",
-        issuer="CN=ArchiveOrigin Test",
-        crl_urls=None,
-        last_checked_at=None,
-    )
-    entry = LedgerEntry(
-        entry_id="entry-1",
+def test_certificate_revocation_is_seen_on_next_verify(seeded_session):
+    assert perform_verification(_verify_request("nonce-revoke-1"), _identity(), seeded_session).status == "verified"
+
+    seeded_session.get(AttestationCertificate, CERT_HASH).revoked = True
+    seeded_session.commit()
+    result = perform_verification(_verify_request("nonce-revoke-2"), _identity(), seeded_session)
+    assert result.reason == "attestation_revoked"
+
+
+def test_perform_verification_missing_certificate(seeded_session):
+    seeded_session.delete(seeded_session.get(AttestationCertificate, CERT_HASH))
+    seeded_session.commit()
+    result = perform_verification(_verify_request("nonce-no-cert"), _identity(), seeded_session)
+    assert result.reason == "attestation_revoked"
+    assert result.details.attestation_valid is False
+
+
+def test_ledger_entry_merkle_proof_round_trips_as_json(seeded_session):
+    seeded_session.get(LedgerEntry, "entry-1").merkle_proof = {"path": ["ab", "cd"], "index": 3}
+    seeded_session.commit()
+    seeded_session.expire_all()
+    result = perform_verification(_verify_request("nonce-proof"), _identity(), seeded_session)
+    assert result.ledger_entry.merkle_proof == {"path": ["ab", "cd"], "index": 3}
+
+
+def test_perform_verification_signature_hash_mismatch(seeded_session):
+    request = VerifyRequest(
         content_hash=CONTENT_HASH,
         manifest_hash=MANIFEST_HASH,
-        device_signature_hash=SIGNATURE_HASH,
         attestation_cert_hash=CERT_HASH,
-        timestamp_utc=now,
-        proof_level="rooted",
-        merkle_root="merkleRoot",
-        merkle_proof=None,
-        entry_hash="e" * 64,
-        created_at_utc=now,
-        sourced_from="test",
+        signature_hash="0" * 64,
+        client_nonce="nonce-sig-mismatch",
     )
-    session.add(cert)
-    session.add(entry)
-    session.commit()
-
-
-def test_perform_verification_success():
-    Session = _session_factory()
-    with Session() as session:
-        _insert_records(session)
-        result = perform_verification(_verify_request("nonce-success"), _identity(), session)
-        assert result.status == "verified"
-        assert result.verification_details.signature_valid is True
-        assert result.proof_level == "rooted"
-
-
-def test_perform_verification_ledger_miss():
-    Session = _session_factory()
-    with Session() as session:
-        result = perform_verification(_verify_request("nonce-miss"), _identity(), session)
-        assert result.status == "not_verified"
-        assert result.reason == "ledger_not_found"
+    result = perform_verification(request, _identity(), seeded_session)
+    assert result.reason == "signature_mismatch"
+    assert result.details.signature_valid is False
+
+
+def test_ledger_entry_schema_is_reused_across_lookups(seeded_session):
+    first = perform_verification(_verify_request("nonce-schema-1"), _identity(), seeded_session)
+    second = perform_verification(_verify_request("nonce-schema-2"), _identity(), seeded_session)
+    assert second.ledger_entry is first.ledger_entry
+
+
+def test_verification_responses_are_frozen(seeded_session):
+    result = perform_verification(_verify_request("nonce-frozen"), _identity(), seeded_session)
+    assert result.verification_details.notes == ("Ledger entry matched.",)
+    with pytest.raises(ValidationError):
+        result.ledger_entry.proof_level = "basic"
@@ -1,24 +1,43 @@
+import functools
+
 import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
 
 from app.verification import validate_manifest_summary, ensure_payload_safe
-from app.schemas import EnrollRequest
+from app.schemas import EnrollRequest, LockProofRequest
 from config import settings
 
-def test_manifest_summary_disallowed_when_globally_disabled():
-    with pytest.raises(Exception):
-        validate_manifest_summary({"title": "example"}, allow_summary=False)
-
-def test_manifest_summary_size_limit():
-    data = {"title": "x" * (settings.manifest_summary_max_bytes)}
-    with pytest.raises(Exception):
-        validate_manifest_summary(data, allow_summary=True)
+@functools.lru_cache(maxsize=1)
+def _oversized_summary():
+    # Built on first use rather than at collection time; the validator serialises the
+    # summary with orjson, so this has to stay a str rather than a cheaper bytes buffer.
+    return {"title": "x" * settings.manifest_summary_max_bytes}
 
-def test_payload_rejects_media_inline():
-    with pytest.raises(Exception):
-        ensure_payload_safe({"media": "data:image/png;base64,AAAA"})
+@pytest.mark.parametrize(
+    "check, payload, kwargs, detail",
+    [
+        pytest.param(
+            validate_manifest_summary, lambda: {"title": "example"}, {"allow_summary": False},
+            "manifest_summary_not_allowed", id="summary-disabled",
+        ),
+        pytest.param(
+            validate_manifest_summary, _oversized_summary, {"allow_summary": True},
+            "manifest_summary_too_large", id="summary-too-large",
+        ),
+        pytest.param(
+            ensure_payload_safe, lambda: {"media": "data:image/png;base64,AAAA"}, {},
+            "media_payload_not_allowed", id="inline-media",
+        ),
+    ],
+)
+def test_rejects_unsafe_payloads(check, payload, kwargs, detail):
+    with pytest.raises(HTTPException) as excinfo:
+        check(payload(), **kwargs)
+    assert excinfo.value.detail == detail
 
 def test_enroll_request_rejects_invalid_devicecheck_token():
-    with pytest.raises(Exception):
+    with pytest.raises(ValidationError):
         EnrollRequest(
             device_id="dev1",
             public_key="ed25519:AAA",
@@ -32,3 +51,33 @@ def test_enroll_request_accepts_valid_devicecheck_token():
         devicecheck_token="QUJDRA==",
     )
     assert req.devicecheck_token == "QUJDRA=="
+
+def _lock_proof(capture_time_utc):
+    return LockProofRequest(
+        asset_hash="sha256:" + "a" * 64,
+        capture_time_utc=capture_time_utc,
+        device_id="dev1",
+        device_pubkey="ed25519:AAA",
+        signature="sig",
+    )
+
+@pytest.mark.parametrize("value", ["2025-11-03T01:01:45Z", "2025-11-03T01:01:45.123+02:00", "2025-11-03T01:01:45"])
+def test_lock_proof_accepts_iso8601_capture_time(value):
+    assert _lock_proof(value).capture_time_utc == value
+
+@pytest.mark.parametrize("value", ["yesterday", "2025-11-03", "2025-13-03T01:01:45Z", "2025-11-03T01:01:45ZZ"])
+def test_lock_proof_rejects_malformed_capture_time(value):
+    with pytest.raises(ValidationError):
+        _lock_proof(value)
+
+def test_payload_rejects_nested_media_case_insensitively():
+    with pytest.raises(HTTPException):
+        ensure_payload_safe({"manifest_summary": {"notes": {"thumb": "DATA:IMAGE/png;BASE64,AAAA"}}})
+    with pytest.raises(HTTPException):
+        ensure_payload_safe({"manifest_summary": {"Image": "x"}})
+    ensure_payload_safe({"manifest_summary": {"title": "ok"}, "client_nonce": "n"})
+
+def test_manifest_summary_rejects_disallowed_fields():
+    with pytest.raises(HTTPException):
+        validate_manifest_summary({"title": "ok", "gps": "1,2"}, allow_summary=True)
+    validate_manifest_summary({"title": "ok", "creator": "me"}, allow_summary=True)